@@ -1,18 +1,36 @@
 from flask_openapi3 import OpenAPI, Info, Tag
-from flask import jsonify, redirect, request
+from flask import Response, jsonify, redirect, request
 from flask_cors import CORS
 from sqlalchemy.exc import IntegrityError
-from schemas.event import EventSchema, EventBuscaSchema, ListagemEventsSchema, EventDelSchema, EventViewSchema
+from schemas.event import EventSchema, EventBuscaSchema, EventDetalheBuscaSchema, EventListagemBuscaSchema, EventProximosBuscaSchema, \
+                          EventCalendarioBuscaSchema, EventCalendarioViewSchema, ListagemEventsSchema, EventDelSchema, EventViewSchema, EventExportBuscaSchema, \
+                          EventPesquisaBuscaSchema, \
+                          EventBatchSchema, EventBatchViewSchema, EventBulkDelSchema, EventBulkUpdateSchema, EventBulkViewSchema
+from schemas.availability import AvailabilityBuscaSchema, AvailabilityViewSchema
 from services.event import EventService
+from services.availability import AvailabilityService
+from services import cache, compression, metrics, profiling, readiness
+from json_provider import configura_json
+from model import engine
+from model.fts import fts_suportado, reconstroi_fts
 import pudb
 
 info = Info(title="Micro Appointment API", version="1.0.0")
 app = OpenAPI(__name__, info=info)
+configura_json(app)
+# after_request roda na ordem inversa do registro: as métricas são as últimas
+metrics.configura_metricas(app, engine)
+# registrado antes da compressão para que o tempo dela entre no total medido
+profiling.configura_profiling(app, engine)
+app.before_request(compression.normaliza_if_none_match)
+app.after_request(compression.comprime_resposta)
 CORS(app)
 
 # Tags definitions
 home_tag = Tag(name="Documentação", description="Seleção de documentação: Swagger, Redoc ou RapiDoc")
 event_tag = Tag(name="Event", description="Adição, visualização, atualização e remoção de events à base (testado)")
+availability_tag = Tag(name="Availability", description="Busca de horários livres nas agendas de doctors e locations")
+monitoramento_tag = Tag(name="Monitoramento", description="Estado interno da aplicação: caches e saúde")
 
 @app.get('/', tags=[home_tag])
 def home():
@@ -39,13 +57,39 @@ def hello_world():
     print('testessssssss', flush=True)
     return jsonify({"message": "Hello World"})
 
+@app.get('/cache/stats', tags=[monitoramento_tag])
+def cache_stats():
+    """Retorna os contadores do cache de listagens de events (hits, misses, descartes)."""
+    return jsonify(cache.listagem_cache.stats())
+
+@app.get('/metrics', tags=[monitoramento_tag])
+def metricas():
+    """Retorna as métricas do serviço no formato texto do Prometheus.
+
+    Com vários workers do gunicorn os valores são somados entre todos os processos.
+    """
+    if not metrics.habilitadas():
+        return jsonify({"status": "error", "msg": "prometheus_client não instalado"}), 503
+    corpo, content_type = metrics.exporta(engine)
+    return Response(corpo, content_type=content_type)
+
+@app.get('/ready', tags=[monitoramento_tag])
+def ready():
+    """Indica se o processo está pronto para receber tráfego (banco acessível e aquecido).
+
+    Retorna 503 enquanto o aquecimento do banco não for concluído com sucesso.
+    """
+    if readiness.esta_pronto():
+        return jsonify({"status": "ok", "msg": "Pronto"}), 200
+    return jsonify({"status": "error", "msg": "Banco ainda não disponível"}), 503
+
 #///////////////////////////////////////////////////////////////////////////////////////
 # APPOINTMENTS
 #///////////////////////////////////////////////////////////////////////////////////////
 
 #POST
 @app.post('/appointment', tags=[event_tag],
-          responses={"200": EventViewSchema, "409": {"description": "Erro de duplicidade"}, "400": {"description": "Erro de requisição"}})
+          responses={"200": EventViewSchema, "409": {"description": "Erro de duplicidade ou conflito de agenda"}, "400": {"description": "Erro de requisição"}})
 def add_event(body: EventSchema):
     """Adiciona um novo Event à base de dados.
     
@@ -53,23 +97,84 @@ def add_event(body: EventSchema):
     """
     return EventService.add_event(body)
 
+#POST (lote)
+@app.post('/appointments/batch', tags=[event_tag],
+          responses={"200": EventBatchViewSchema, "400": {"description": "Erro de requisição"}})
+def add_events_batch(body: EventBatchSchema):
+    """Adiciona uma lista de Event à base de dados em uma única transação.
+    
+    Retorna o resultado de cada item na ordem enviada; itens com name duplicado
+    recebem status 409 sem impedir a inserção dos demais.
+    """
+    return EventService.add_events_batch(body)
+
 #GET ALL
 @app.get('/appointments', tags=[event_tag],
-         responses={"200": ListagemEventsSchema, "404": {"description": "Event não encontrado"}})
-def get_events():
+         responses={"200": ListagemEventsSchema, "400": {"description": "Cursor inválido"}})
+def get_events(query: EventListagemBuscaSchema):
     """Faz a busca por todos os Event cadastrados.
     
     Retorna uma representação da listagem de events. Se o parâmetro "user_id" for
     fornecido na query string, somente os events desse usuário serão retornados.
+    Informando "limit" a listagem é paginada; use o "next_cursor" retornado como
+    "cursor" para buscar a próxima página. Os parâmetros "from", "to" e "upcoming"
+    restringem a listagem a um intervalo de datas. Com "fields" (ex.: fields=name,date,type)
+    apenas esses campos, e o "id", são lidos e retornados.
     """
-    return EventService.get_events()
+    return EventService.get_events(query)
+
+#GET NEXT
+@app.get('/appointments/next', tags=[event_tag],
+         responses={"200": ListagemEventsSchema})
+def get_next_events(query: EventProximosBuscaSchema):
+    """Faz a busca dos próximos "n" Event de um usuário, a partir de agora.
+    
+    Retorna os events em ordem de data; o "next_cursor" permite continuar a listagem.
+    """
+    return EventService.get_next_events(query)
+
+#CALENDAR
+@app.get('/appointments/calendar', tags=[event_tag],
+         responses={"200": EventCalendarioViewSchema, "400": {"description": "Banco sem suporte à agregação"}})
+def get_calendar(query: EventCalendarioBuscaSchema):
+    """Conta os Event de um usuário por dia, semana ou mês, separados por tipo.
+    
+    A contagem é feita no banco; a resposta traz a lista de períodos ("buckets") e,
+    para cada tipo, a quantidade de events em cada período na mesma posição.
+    """
+    return EventService.get_calendar(query)
+
+#SEARCH
+@app.get('/appointments/search', tags=[event_tag],
+         responses={"200": ListagemEventsSchema, "400": {"description": "Busca ou cursor inválido, ou banco sem busca textual"}})
+def search_events(query: EventPesquisaBuscaSchema):
+    """Busca os Event de um usuário pelas palavras de "q".
+    
+    Procura em name, description, observation, doctor_name e location_name, com
+    cada palavra tratada como prefixo. O resultado vem por ordem de relevância e é
+    paginado por "limit" e "cursor".
+    """
+    return EventService.search_events(query)
+
+#EXPORT
+@app.get('/appointments/export', tags=[event_tag],
+         responses={"200": {"description": "Events do usuário em NDJSON, um event por linha"}})
+def export_events(query: EventExportBuscaSchema):
+    """Exporta todos os Event de um usuário no formato NDJSON.
+    
+    A resposta é enviada em streaming, um event por linha, sem montar a listagem
+    completa em memória. Indicada para sincronizações com muitos events.
+    """
+    return EventService.export_events(query)
+
 #GET ONE
 @app.get('/appointment', tags=[event_tag],
          responses={"200": EventViewSchema, "404": {"description": "Event não encontrado"}})
-def get_event(query: EventBuscaSchema):
+def get_event(query: EventDetalheBuscaSchema):
     """Faz a busca por um Event a partir do name do event.
     
-    Retorna uma representação dos events e comentários associados.
+    Retorna uma representação dos events e comentários associados. Com "fields"
+    apenas os campos pedidos, e o "id", são retornados, sem os comentários.
     """
     return EventService.get_event(query)
 
@@ -84,7 +189,8 @@ def del_event(query: EventBuscaSchema):
     return EventService.del_event_by_id_and_user(query)
 
 @app.put('/appointment', tags=[event_tag],
-         responses={"200": EventViewSchema, "404": {"description": "Event não encontrado"}, "400": {"description": "Erro de requisição"}})
+         responses={"200": EventViewSchema, "404": {"description": "Event não encontrado"}, "400": {"description": "Erro de requisição"},
+                    "409": {"description": "Erro de duplicidade ou conflito de agenda"}})
 def update_event(query: EventBuscaSchema, body: EventSchema):
     """
     Atualiza um Event utilizando os parâmetros de query (id e user_id) e os dados enviados no body.
@@ -93,5 +199,55 @@ def update_event(query: EventBuscaSchema, body: EventSchema):
     """
     return EventService.update_event(query, body)
 
+#DELETE (lote)
+@app.delete('/appointments', tags=[event_tag],
+            responses={"200": EventBulkViewSchema})
+def del_events(body: EventBulkDelSchema):
+    """Deleta, em uma única operação, os Event informados em "ids" que pertençam ao "user_id".
+    
+    Retorna os ids removidos e os que não foram encontrados para o usuário.
+    """
+    return EventService.del_events_by_ids_and_user(body)
+
+#PATCH (lote)
+@app.patch('/appointments', tags=[event_tag],
+           responses={"200": EventBulkViewSchema, "400": {"description": "Erro de requisição"}, "409": {"description": "Erro de duplicidade"}})
+def update_events(body: EventBulkUpdateSchema):
+    """Atualiza, em uma única operação, os Event informados em "ids" que pertençam ao "user_id".
+    
+    Somente os campos enviados em "changes" são alterados. Retorna os ids atualizados
+    e os que não foram encontrados para o usuário.
+    """
+    return EventService.update_events_by_ids_and_user(body)
+
+#///////////////////////////////////////////////////////////////////////////////////////
+# AVAILABILITY
+#///////////////////////////////////////////////////////////////////////////////////////
+
+@app.get('/availability', tags=[availability_tag],
+         responses={"200": AvailabilityViewSchema, "400": {"description": "Erro de requisição"}})
+def get_availability(query: AvailabilityBuscaSchema):
+    """Busca os horários livres de um ou mais doctors/locations em um intervalo de datas.
+    
+    Considera os events já agendados e o expediente informado (work_start, work_end e
+    work_days). Para várias agendas repita o parâmetro, ex.: ?doctor_id=1&doctor_id=2;
+    com "first_only" retorna apenas o primeiro horário livre de cada agenda.
+    """
+    return AvailabilityService.get_availability(query)
+
+#///////////////////////////////////////////////////////////////////////////////////////
+# COMANDOS (flask --app app <comando>)
+#///////////////////////////////////////////////////////////////////////////////////////
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index():
+    """Reconstrói o índice de busca textual a partir da tabela event (ex.: se o índice for corrompido)."""
+    if not fts_suportado(engine):
+        print(f"Busca textual não suportada para o banco '{engine.dialect.name}'")
+        return
+    reconstroi_fts(engine)
+    print("Índice de busca textual reconstruído")
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
+
@@ -0,0 +1,124 @@
+"""
+Entrada ASGI da API. As rotas mais acessadas de appointments são atendidas pelo
+AsyncEventService, sobre a engine assíncrona (aiosqlite/asyncpg), sem prender uma
+thread durante a ida ao banco. As demais rotas, a documentação e o Swagger continuam
+no app Flask (app.py), montado como WSGI.
+
+Uso:
+    uvicorn asgi:asgi_app --host 0.0.0.0 --port 5000 --workers 2
+"""
+import contextlib
+import json
+
+from a2wsgi import WSGIMiddleware
+from pydantic import ValidationError
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags
+
+from app import app
+from model.async_session import engine_async
+from schemas.event import EventSchema, EventBuscaSchema, EventDetalheBuscaSchema, EventListagemBuscaSchema, \
+                          EventProximosBuscaSchema
+from services.compression import NIVEL_GZIP, TAMANHO_MINIMO
+from services.event_async import AsyncEventService
+
+
+def responde(resultado) -> Response:
+    """
+    Converte a tupla (data, status[, headers]) retornada pelos services em resposta,
+    serializando com o mesmo provider JSON do app Flask.
+    """
+    data, status, *cabecalhos = resultado
+    cabecalhos = cabecalhos[0] if cabecalhos else {}
+    if status == 304 or data == "":
+        return Response(status_code=status, headers=cabecalhos)
+    return Response(app.json.dumps(data), status_code=status, headers=cabecalhos, media_type="application/json")
+
+
+def erro_validacao(e: ValidationError) -> Response:
+    # mesmo status e corpo que o flask-openapi3 retorna para parâmetros inválidos
+    return Response(e.json(), status_code=422, media_type="application/json")
+
+
+def le_query(request, schema):
+    # parâmetros repetidos (ex.: fields=name&fields=date) chegam como lista
+    parametros = {}
+    for chave in request.query_params:
+        valores = request.query_params.getlist(chave)
+        parametros[chave] = valores if len(valores) > 1 else valores[0]
+    return schema.model_validate(parametros)
+
+
+async def le_body(request, schema):
+    try:
+        payload = await request.json()
+    except json.JSONDecodeError:
+        payload = None
+    return schema.model_validate(payload)
+
+
+#GET
+async def get_events(request):
+    try:
+        query = le_query(request, EventListagemBuscaSchema)
+    except ValidationError as e:
+        return erro_validacao(e)
+    if_none_match = parse_etags(request.headers.get("if-none-match"))
+    return responde(await AsyncEventService.get_events(query, if_none_match))
+
+
+#GET
+async def get_next_events(request):
+    try:
+        query = le_query(request, EventProximosBuscaSchema)
+    except ValidationError as e:
+        return erro_validacao(e)
+    if_none_match = parse_etags(request.headers.get("if-none-match"))
+    return responde(await AsyncEventService.get_next_events(query, if_none_match))
+
+
+#GET, POST, PUT e DELETE
+async def appointment(request):
+    try:
+        if request.method == "POST":
+            body = await le_body(request, EventSchema)
+            return responde(await AsyncEventService.add_event(body))
+        if request.method == "GET":
+            query = le_query(request, EventDetalheBuscaSchema)
+            return responde(await AsyncEventService.get_event(query))
+        query = le_query(request, EventBuscaSchema)
+        if request.method == "DELETE":
+            return responde(await AsyncEventService.del_event_by_id_and_user(query))
+        body = await le_body(request, EventSchema)
+        return responde(await AsyncEventService.update_event(query, body))
+    except ValidationError as e:
+        return erro_validacao(e)
+
+
+@contextlib.asynccontextmanager
+async def ciclo_de_vida(app):
+    yield
+    await engine_async.dispose()
+
+
+# rotas não listadas aqui (lote, calendário, exportação, availability, docs...) e
+# métodos não atendidos (ex.: DELETE/PATCH em /appointments) caem no app Flask
+asgi_app = Starlette(
+    routes=[
+        Route("/appointments", get_events, methods=["GET"]),
+        Route("/appointments/next", get_next_events, methods=["GET"]),
+        Route("/appointment", appointment, methods=["GET", "POST", "PUT", "DELETE"]),
+        Mount("/", app=WSGIMiddleware(app)),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+        # as rotas do Flask já chegam comprimidas (services.compression) e não são recomprimidas
+        Middleware(GZipMiddleware, minimum_size=TAMANHO_MINIMO, compresslevel=NIVEL_GZIP),
+    ],
+    lifespan=ciclo_de_vida,
+)
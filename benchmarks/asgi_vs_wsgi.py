@@ -0,0 +1,49 @@
+"""
+Compara a API servida pelo caminho WSGI (gunicorn + app:app) com a entrada ASGI
+(uvicorn + asgi:asgi_app) sob a mesma carga concorrente (benchmarks.carga), sobre
+o mesmo banco sqlite populado por benchmarks.dataset.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.asgi_vs_wsgi [--threads 64] [--requisicoes 2000] [--workers 1]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.carga import executa_carga, inicia_servidor
+from benchmarks.dataset import gera_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--porta", type=int, default=5055)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    usuarios = max(10, args.events // 200)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_url = "sqlite:///%s" % os.path.join(diretorio, "bench.sqlite3")
+        gera_dataset(db_url, args.events, usuarios).dispose()
+        for modo in ("wsgi", "asgi"):
+            # sem cache de listagens, para que a comparação seja do caminho até o banco
+            processo = inicia_servidor(modo, db_url, args.porta, args.workers, {"LISTAGEM_CACHE_MAXSIZE": "0"})
+            try:
+                resultado = executa_carga(f"http://127.0.0.1:{args.porta}", args.threads,
+                                          requisicoes=args.requisicoes, usuarios=usuarios, events=args.events)
+            finally:
+                processo.terminate()
+                processo.wait(10)
+            print(json.dumps({"modo": modo, **resultado["total"], "erros": resultado["erros"]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Gerador de carga HTTP multi-thread contra a API. Cada thread mantém uma conexão
+keep-alive e sorteia requisições de um cenário com listagens, próximos events,
+detalhe e calendário, escolhendo usuários pela mesma distribuição do dataset.
+O resultado (p50/p95/p99 e requisições por segundo, no total e por endpoint) é
+impresso como JSON, para comparar versões.
+
+Uso (a partir da raiz do projeto):
+    # sobe a API localmente (gunicorn) sobre um dataset gerado
+    python -m benchmarks.carga --servidor wsgi --events 100000 --threads 16 --duracao 30
+    # ou usa um servidor já em execução, populado com benchmarks.dataset
+    python -m benchmarks.carga --url http://localhost:5000 --usuarios 500 --saida carga.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.dataset import gera_dataset, pesos_zipf, user_id_sintetico
+from benchmarks.metricas import resume_latencias
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# (peso, endpoint, caminho); {user} e {n} são sorteados a cada requisição
+CENARIO = (
+    (6, "GET /appointments", "/appointments?user_id={user}&limit=50"),
+    (2, "GET /appointments/next", "/appointments/next?user_id={user}&n=5"),
+    (1, "GET /appointment", "/appointment?id=Consulta%20{n}"),
+    (1, "GET /appointments/calendar", "/appointments/calendar?user_id={user}&granularity=month"),
+)
+
+SERVIDORES = {
+    "wsgi": lambda porta, workers: [
+        sys.executable, "-m", "gunicorn", "app:app", "--config", "gunicorn.conf.py",
+        "--bind", f"127.0.0.1:{porta}", "--workers", str(workers),
+    ],
+    "asgi": lambda porta, workers: [
+        sys.executable, "-m", "uvicorn", "asgi:asgi_app", "--host", "127.0.0.1", "--port", str(porta),
+        "--workers", str(workers), "--log-level", "warning",
+    ],
+}
+
+
+def aguarda_servidor(url, limite=60):
+    fim = time.time() + limite
+    while time.time() < fim:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            # URLError, HTTPError (503 até o aquecimento) e timeouts
+            time.sleep(0.2)
+    raise RuntimeError(f"Servidor não respondeu em {limite}s: {url}")
+
+
+def inicia_servidor(modo, db_url, porta, workers, ambiente=None):
+    """
+    Sobe a API no modo 'wsgi' (gunicorn) ou 'asgi' (uvicorn) sobre db_url e aguarda
+    o /ready. Retorna o processo, que deve ser encerrado por quem chamou.
+    """
+    ambiente = {**os.environ, "DATABASE_URL": db_url, **(ambiente or {})}
+    processo = subprocess.Popen(SERVIDORES[modo](porta, workers), cwd=RAIZ, env=ambiente,
+                                stdout=subprocess.DEVNULL)
+    try:
+        aguarda_servidor(f"http://127.0.0.1:{porta}/ready")
+    except Exception:
+        processo.terminate()
+        raise
+    return processo
+
+
+def _trabalhador(base, fim, limite, contador, usuarios, events, semente, resultados):
+    aleatorio = random.Random(semente)
+    pesos_usuarios = pesos_zipf(usuarios)
+    pesos_cenario = [peso for peso, _, _ in CENARIO]
+    alvo = urlsplit(base)
+    conexao = http.client.HTTPConnection(alvo.hostname, alvo.port, timeout=30)
+    while time.perf_counter() < fim:
+        if limite is not None:
+            with contador["lock"]:
+                if contador["enviadas"] >= limite:
+                    break
+                contador["enviadas"] += 1
+        _, endpoint, caminho = aleatorio.choices(CENARIO, weights=pesos_cenario)[0]
+        usuario = aleatorio.choices(range(usuarios), cum_weights=pesos_usuarios)[0]
+        caminho = caminho.format(user=user_id_sintetico(usuario), n=aleatorio.randrange(events))
+        inicio = time.perf_counter()
+        try:
+            conexao.request("GET", alvo.path.rstrip("/") + caminho, headers={"Accept-Encoding": "gzip"})
+            resposta = conexao.getresponse()
+            resposta.read()
+            ok = resposta.status < 500
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conexao.close()
+        resultados.append((endpoint, (time.perf_counter() - inicio) * 1000, ok))
+    conexao.close()
+
+
+def executa_carga(base, threads, duracao=None, requisicoes=None, usuarios=500, events=100000, semente=0):
+    """
+    Dispara a carga por 'duracao' segundos ou até 'requisicoes' respostas e retorna o
+    resumo das latências no total e por endpoint.
+    """
+    fim = time.perf_counter() + (duracao if duracao else float("inf"))
+    contador = {"enviadas": 0, "lock": threading.Lock()}
+    resultados = []
+    trabalhadores = [
+        threading.Thread(target=_trabalhador, args=(base, fim, requisicoes, contador, usuarios, events,
+                                                    semente + i, resultados))
+        for i in range(threads)
+    ]
+    inicio = time.perf_counter()
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    tempo_total = time.perf_counter() - inicio
+
+    por_endpoint = {}
+    for endpoint, latencia, ok in resultados:
+        if ok:
+            por_endpoint.setdefault(endpoint, []).append(latencia)
+    sucesso = [latencia for _, latencia, ok in resultados if ok]
+    return {
+        "threads": threads,
+        "duracao_s": round(tempo_total, 2),
+        "erros": sum(1 for _, _, ok in resultados if not ok),
+        "total": resume_latencias(sucesso, tempo_total),
+        "endpoints": {nome: resume_latencias(latencias, tempo_total) for nome, latencias in por_endpoint.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    alvo = parser.add_mutually_exclusive_group(required=True)
+    alvo.add_argument("--url", help="servidor já em execução")
+    alvo.add_argument("--servidor", choices=sorted(SERVIDORES), help="sobe a API localmente")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duracao", type=float, default=30)
+    parser.add_argument("--requisicoes", type=int, help="encerra após N requisições")
+    parser.add_argument("--events", type=int, default=100000, help="tamanho do dataset")
+    parser.add_argument("--usuarios", type=int, help="usuários do dataset (padrão: events / 200)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--porta", type=int, default=5055)
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    usuarios = args.usuarios or max(10, args.events // 200)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        processo = None
+        base = args.url
+        if args.servidor:
+            db_url = "sqlite:///%s" % os.path.join(diretorio, "carga.sqlite3")
+            gera_dataset(db_url, args.events, usuarios).dispose()
+            processo = inicia_servidor(args.servidor, db_url, args.porta, args.workers)
+            base = f"http://127.0.0.1:{args.porta}"
+        try:
+            resultado = executa_carga(base, args.threads, None if args.requisicoes else args.duracao,
+                                      args.requisicoes, usuarios, args.events)
+        finally:
+            if processo is not None:
+                processo.terminate()
+                processo.wait(10)
+    resultado.update(alvo=args.servidor or args.url, events=args.events, workers=args.workers)
+
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            arquivo.write(saida)
+    else:
+        print(saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Gera um banco sqlite com events sintéticos para os benchmarks.
+
+Os usuários e doctors seguem uma distribuição de Zipf (poucos usuários com muitos
+events, muitos com poucos), as datas se espalham por dois anos em horário comercial
+e a geração é determinística para a mesma semente.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.dataset --events 100000 --saida /tmp/bench.sqlite3
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert
+
+from model import Base, Event
+from model.database import cria_engine
+from model.migration import cria_indices_ausentes
+
+# tamanhos usados pela suíte de benchmarks
+TAMANHOS = (10_000, 100_000, 1_000_000)
+
+INICIO_DATASET = datetime(2024, 1, 1)
+DIAS_DATASET = 730
+LOTE_INSERCAO = 10_000
+DURACOES = (15, 30, 30, 30, 45, 60)
+DOCTORS = ("Dra. Ana", "Dr. Bruno", "Dra. Carla", "Dr. Diego", "Dra. Elisa", "Dr. Fábio")
+LOCAIS = ("Clínica Centro", "Hospital Norte", "Policlínica Sul", "Consultório Boa Vista")
+
+
+def pesos_zipf(quantidade, s=1.1):
+    return list(itertools.accumulate(1 / (posicao ** s) for posicao in range(1, quantidade + 1)))
+
+
+def user_id_sintetico(indice: int) -> str:
+    # ids estáveis: o usuário mais ativo é sempre "bench-user-0000000"
+    return f"bench-user-{indice:07d}"
+
+
+def gera_linhas(quantidade, usuarios, doctors, semente):
+    """
+    Gera os dicts das linhas da tabela event, em lotes de LOTE_INSERCAO, para que a
+    memória usada não dependa do tamanho do dataset.
+    """
+    aleatorio = random.Random(semente)
+    pesos_usuarios = pesos_zipf(usuarios)
+    pesos_doctors = pesos_zipf(doctors)
+    lote = []
+    for i in range(quantidade):
+        usuario = aleatorio.choices(range(usuarios), cum_weights=pesos_usuarios)[0]
+        doctor = aleatorio.choices(range(doctors), cum_weights=pesos_doctors)[0] + 1
+        data = INICIO_DATASET + timedelta(
+            days=aleatorio.randrange(DIAS_DATASET),
+            hours=aleatorio.randrange(8, 18),
+            minutes=aleatorio.choice((0, 15, 30, 45)),
+        )
+        lote.append({
+            "pk_event": str(uuid.UUID(int=aleatorio.getrandbits(128))),
+            "user_id": user_id_sintetico(usuario),
+            "name": f"Consulta {i}",
+            "description": aleatorio.choice(("Retorno", "Primeira consulta", "Exame de rotina")) * 3,
+            "observation": aleatorio.choice(("", "Levar exames anteriores", "Jejum de 8 horas")),
+            "type": aleatorio.choices((1, 2), weights=(8, 2))[0],
+            "date": data,
+            "duration_minutes": aleatorio.choice(DURACOES),
+            "doctor_id": doctor,
+            "doctor_name": DOCTORS[doctor % len(DOCTORS)],
+            "location_id": doctor % max(1, doctors // 3) + 1,
+            "location_name": LOCAIS[doctor % len(LOCAIS)],
+            "data_insercao": data - timedelta(days=7),
+        })
+        if len(lote) == LOTE_INSERCAO:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def gera_dataset(db_url, quantidade, usuarios=None, doctors=None, semente=42):
+    """
+    Cria as tabelas e insere 'quantidade' events em db_url. Por padrão há um usuário
+    para cada 200 events e um doctor para cada 2000. Retorna a engine criada.
+    """
+    usuarios = usuarios or max(10, quantidade // 200)
+    doctors = doctors or max(5, quantidade // 2000)
+    engine = cria_engine(db_url)
+    Base.metadata.create_all(engine)
+    for lote in gera_linhas(quantidade, usuarios, doctors, semente):
+        with engine.begin() as conexao:
+            conexao.execute(insert(Event.__table__), lote)
+    cria_indices_ausentes(engine)
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql("ANALYZE")
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=TAMANHOS[0])
+    parser.add_argument("--usuarios", type=int)
+    parser.add_argument("--doctors", type=int)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", required=True, help="arquivo sqlite a ser criado")
+    args = parser.parse_args()
+
+    if os.path.exists(args.saida):
+        parser.error(f"O arquivo {args.saida} já existe")
+    inicio = time.perf_counter()
+    engine = gera_dataset("sqlite:///%s" % os.path.abspath(args.saida), args.events,
+                          args.usuarios, args.doctors, args.semente)
+    engine.dispose()
+    print(f"{args.events} events gerados em {time.perf_counter() - inicio:.1f}s: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
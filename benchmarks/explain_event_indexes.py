@@ -0,0 +1,86 @@
+"""
+Mostra o plano de execução (EXPLAIN QUERY PLAN) das consultas do EventService
+antes e depois da criação dos índices da tabela event.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.explain_event_indexes
+"""
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import create_engine, delete, select, tuple_, update
+from sqlalchemy.dialects import sqlite
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model import Base, Event
+from model.migration import cria_indices_ausentes
+
+
+# Consultas equivalentes às emitidas pelo EventService
+CONSULTAS = {
+    "listagem por usuário": select(Event).where(Event.user_id == "u").order_by(Event.date, Event.id).limit(51),
+    "página seguinte por usuário": select(Event).where(
+        Event.user_id == "u", tuple_(Event.date, Event.id) > (datetime(2024, 1, 1), "x")
+    ).order_by(Event.date, Event.id).limit(51),
+    "intervalo de datas por usuário": select(Event).where(
+        Event.user_id == "u", Event.date >= datetime(2024, 1, 1), Event.date < datetime(2024, 1, 8)
+    ).order_by(Event.date, Event.id),
+    "listagem sem filtro": select(Event).order_by(Event.date, Event.id).limit(51),
+    "remoção por id e usuário": delete(Event).where(Event.id == "x", Event.user_id == "u"),
+    "atualização por id e usuário": update(Event).where(Event.id == "x", Event.user_id == "u").values(name="n"),
+    "agenda do doctor": select(Event).where(Event.doctor_id == 1, Event.date >= datetime(2024, 1, 1)),
+    "agenda do location": select(Event).where(Event.location_id == 1, Event.date >= datetime(2024, 1, 1)),
+}
+
+
+def plano(conexao, consulta):
+    compilada = consulta.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    linhas = conexao.exec_driver_sql(f"EXPLAIN QUERY PLAN {compilada}").fetchall()
+    return [linha[-1] for linha in linhas]
+
+
+def resumo(engine):
+    resultado = {}
+    with engine.connect() as conexao:
+        for nome, consulta in CONSULTAS.items():
+            detalhes = plano(conexao, consulta)
+            resultado[nome] = {
+                # SCAN sem USING INDEX é uma leitura completa da tabela
+                "scans": sum(1 for d in detalhes if d.startswith("SCAN") and "USING" not in d),
+                "temp_b_tree": sum(1 for d in detalhes if "TEMP B-TREE" in d),
+                "plano": detalhes,
+            }
+    return resultado
+
+
+def main():
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = create_engine("sqlite:///%s/explain.sqlite3" % diretorio)
+        Base.metadata.create_all(engine)
+        # remove os índices declarados para simular um banco criado antes deles
+        with engine.begin() as conexao:
+            for indice in Event.__table__.indexes:
+                conexao.exec_driver_sql(f"DROP INDEX {indice.name}")
+
+        antes = resumo(engine)
+        cria_indices_ausentes(engine)
+        depois = resumo(engine)
+        engine.dispose()
+
+    relatorio = {
+        nome: {"antes": antes[nome], "depois": depois[nome]}
+        for nome in CONSULTAS
+    }
+    relatorio["total_scans"] = {
+        "antes": sum(r["scans"] for r in antes.values()),
+        "depois": sum(r["scans"] for r in depois.values()),
+    }
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
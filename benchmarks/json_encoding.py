@@ -0,0 +1,64 @@
+"""
+Mede o tempo para serializar a listagem de events (apresenta_events) com o provider
+JSON padrão do Flask e com o OrjsonProvider, nos formatos de data "http" e "iso".
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.json_encoding [--events 10000] [--repeticoes 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from json_provider import OrjsonProvider
+from model.event import Event, EventType
+from schemas.event import apresenta_events
+
+
+def listagem(quantidade):
+    inicio = datetime(2024, 1, 1, 8, 0)
+    events = [Event(
+        id=f"event-{i}", name=f"Consulta {i}", date=inicio + timedelta(hours=i), type=EventType.CONSULTATION,
+        description="Retorno", observation="Levar exames", doctor_name="Dra. Ana", location_name="Clínica",
+        location_id=1, doctor_id=1, user_id="user-1", duration_minutes=30,
+    ) for i in range(quantidade)]
+    return {"status": "ok", "msg": "Events coletados com sucesso.", "data": apresenta_events(events)}
+
+
+def mede(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    corpo = listagem(args.events)
+    # o provider padrão não serializa Enum; o apresenta_events entrega o valor já convertido
+    padrao = mede(lambda: app.json.dumps(corpo), args.repeticoes)
+    resultados = {"events": args.events, "stdlib_ms": round(padrao, 2)}
+    for formato in ("http", "iso"):
+        os.environ["JSON_DATETIME_FORMAT"] = formato
+        provider = OrjsonProvider(app)
+        tempo = mede(lambda: provider.dumps(corpo), args.repeticoes)
+        resultados[f"orjson_{formato}_ms"] = round(tempo, 2)
+        resultados[f"orjson_{formato}_speedup"] = round(padrao / tempo, 1)
+    print(json.dumps(resultados))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Funções de resumo compartilhadas pelos benchmarks.
+"""
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def resume_latencias(latencias_ms, duracao_s=None) -> dict:
+    """
+    Resume uma lista de latências (em ms) em média, p50, p95 e p99 e, se a duração
+    total for informada, em requisições por segundo.
+    """
+    resumo = {"n": len(latencias_ms)}
+    if latencias_ms:
+        resumo.update(
+            media_ms=round(sum(latencias_ms) / len(latencias_ms), 3),
+            p50_ms=round(percentil(latencias_ms, 0.50), 3),
+            p95_ms=round(percentil(latencias_ms, 0.95), 3),
+            p99_ms=round(percentil(latencias_ms, 0.99), 3),
+        )
+    if duracao_s:
+        resumo["requisicoes_por_segundo"] = round(len(latencias_ms) / duracao_s, 1)
+    return resumo
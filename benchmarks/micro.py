@@ -0,0 +1,247 @@
+"""
+Micro-benchmarks de cada operação do EventService (e do AvailabilityService) e dos
+serializadores, sobre datasets gerados por benchmarks.dataset. O resultado é um
+JSON com média e p50/p95/p99 (ms) por operação e tamanho de dataset.
+
+O cache de listagens fica desligado para que as medições reflitam o banco; use
+--com-cache para medir o caminho com cache.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.micro [--tamanhos 10000 100000 1000000] [--repeticoes 50] [--saida resultado.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+from app import app
+from model import Session, Event
+from schemas.availability import AvailabilityBuscaSchema
+from schemas.event import (
+    EventSchema, EventBatchSchema, EventBulkDelSchema, EventBulkUpdateSchema, EventBuscaSchema,
+    EventCalendarioBuscaSchema, EventDetalheBuscaSchema, EventExportBuscaSchema, EventListagemBuscaSchema,
+    EventPatchSchema, EventPesquisaBuscaSchema, EventProximosBuscaSchema, apresenta_event, apresenta_events, apresenta_linhas,
+)
+from services import cache
+from services.availability import AvailabilityService
+from services.event import COLUNAS_LISTAGEM, EventService, codifica_cursor
+from benchmarks.dataset import TAMANHOS, gera_dataset, user_id_sintetico
+from benchmarks.metricas import resume_latencias
+
+
+def mede(funcao, repeticoes, aquecimento=3):
+    for _ in range(aquecimento):
+        funcao()
+    latencias = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return resume_latencias(latencias)
+
+
+def no_contexto(funcao, *args):
+    # os services usam request (If-None-Match) e stream_with_context
+    def executa():
+        with app.test_request_context():
+            resultado = funcao(*args)
+            if hasattr(resultado, "response"):
+                for _ in resultado.response:
+                    pass
+            return resultado
+    return executa
+
+
+def usuario_mediano():
+    session = Session()
+    try:
+        contagens = session.execute(
+            select(func.count()).select_from(Event).group_by(Event.user_id).order_by(func.count())
+        ).scalars().all()
+        mediana = contagens[len(contagens) // 2]
+        return session.execute(
+            select(Event.user_id).group_by(Event.user_id).having(func.count() == mediana).limit(1)
+        ).scalar()
+    finally:
+        session.close()
+
+
+def leituras(repeticoes):
+    pesado = user_id_sintetico(0)
+    mediano = usuario_mediano()
+    session = Session()
+    try:
+        total_pesado = session.query(Event).filter(Event.user_id == pesado).count()
+        meio = session.execute(
+            select(Event.date, Event.id).where(Event.user_id == pesado)
+            .order_by(Event.date, Event.id).offset(total_pesado // 2).limit(1)
+        ).one()
+    finally:
+        session.close()
+    mes = {"from": datetime(2024, 6, 1), "to": datetime(2024, 7, 1)}
+
+    operacoes = {
+        "get_events primeira página (limit 50)":
+            (EventService.get_events, EventListagemBuscaSchema(user_id=pesado, limit=50)),
+        "get_events página do meio (cursor)":
+            (EventService.get_events, EventListagemBuscaSchema(user_id=pesado, limit=50, cursor=codifica_cursor(meio))),
+        "get_events intervalo de um mês":
+            (EventService.get_events, EventListagemBuscaSchema(user_id=pesado, **mes)),
+        "get_events fields=name,date,type":
+            (EventService.get_events, EventListagemBuscaSchema(user_id=pesado, limit=50, fields="name,date,type")),
+        "get_events com total de comentários":
+            (EventService.get_events, EventListagemBuscaSchema(user_id=pesado, limit=50, with_total_comentarios=True)),
+        "get_events usuário mediano completo":
+            (EventService.get_events, EventListagemBuscaSchema(user_id=mediano)),
+        "get_next_events (n=5)":
+            (EventService.get_next_events, EventProximosBuscaSchema(user_id=pesado, n=5)),
+        "get_calendar por mês":
+            (EventService.get_calendar, EventCalendarioBuscaSchema(user_id=pesado, granularity="month")),
+        "search_events usuário mediano (q=jejum)":
+            (EventService.search_events, EventPesquisaBuscaSchema(user_id=mediano, q="jejum")),
+        "search_events usuário pesado (q=retorno exames)":
+            (EventService.search_events, EventPesquisaBuscaSchema(user_id=pesado, q="retorno exames")),
+        "export_events usuário mediano":
+            (EventService.export_events, EventExportBuscaSchema(user_id=mediano)),
+        "get_event":
+            (EventService.get_event, EventDetalheBuscaSchema(id="Consulta 1", user_id=pesado)),
+        "get_availability doctor 1, uma semana":
+            (AvailabilityService.get_availability, AvailabilityBuscaSchema(
+                doctor_id=[1], **{"from": datetime(2024, 6, 3), "to": datetime(2024, 6, 10)})),
+    }
+    return {nome: mede(no_contexto(funcao, query), repeticoes) for nome, (funcao, query) in operacoes.items()}
+
+
+def escritas(repeticoes):
+    """
+    Cria, atualiza e remove events de um usuário próprio, em datas e doctor fora do
+    dataset para não haver conflitos de agenda; o banco volta ao estado original.
+    """
+    user_id = "bench-escrita"
+    sequencia = iter(range(10 ** 9))
+    ids = []
+
+    def novo_event():
+        i = next(sequencia)
+        return EventSchema(name=f"Bench escrita {i}", date=datetime(2030, 1, 1) + timedelta(hours=i),
+                           user_id=user_id, doctor_id=999999, location_id=999999, duration_minutes=30)
+
+    def adiciona():
+        with app.test_request_context():
+            ids.append(EventService.add_event(novo_event())[0]["data"]["id"])
+
+    def atualiza():
+        with app.test_request_context():
+            event_id = ids[next(sequencia) % len(ids)]
+            EventService.update_event(EventBuscaSchema(id=event_id, user_id=user_id), novo_event())
+
+    def remove():
+        with app.test_request_context():
+            EventService.del_event_by_id_and_user(EventBuscaSchema(id=ids.pop(), user_id=user_id))
+
+    def lote():
+        with app.test_request_context():
+            data = EventService.add_events_batch(EventBatchSchema(events=[novo_event() for _ in range(100)]))[0]["data"]
+            ids.extend(r["data"]["id"] for r in data["results"] if r["status"] == 200)
+
+    def atualiza_lote():
+        with app.test_request_context():
+            EventService.update_events_by_ids_and_user(EventBulkUpdateSchema(
+                user_id=user_id, ids=ids[-100:], changes=EventPatchSchema(observation="lote")))
+
+    def remove_lote():
+        with app.test_request_context():
+            EventService.del_events_by_ids_and_user(EventBulkDelSchema(user_id=user_id, ids=ids[-100:]))
+            del ids[-100:]
+
+    resultados = {
+        "add_event": mede(adiciona, repeticoes),
+        "update_event": mede(atualiza, repeticoes),
+        "del_event_by_id_and_user": mede(remove, repeticoes),
+    }
+    lotes = max(1, repeticoes // 5)
+    resultados["add_events_batch (100 events)"] = mede(lote, lotes)
+    resultados["update_events_by_ids_and_user (100 ids)"] = mede(atualiza_lote, lotes)
+    resultados["del_events_by_ids_and_user (100 ids)"] = mede(remove_lote, lotes)
+    while ids:
+        remove_lote()
+    return resultados
+
+
+def serializadores(repeticoes):
+    session = Session()
+    try:
+        events_50 = session.query(Event).order_by(Event.date).limit(50).all()
+        events_1000 = session.query(Event).order_by(Event.date).limit(1000).all()
+        linhas_1000 = session.execute(select(*COLUNAS_LISTAGEM).order_by(Event.date).limit(1000)).all()
+        event = session.query(Event).options(joinedload(Event.comentarios)).first()
+        return {
+            "apresenta_events (50)": mede(lambda: apresenta_events(events_50), repeticoes),
+            "apresenta_events (1000)": mede(lambda: apresenta_events(events_1000), repeticoes),
+            "apresenta_linhas (1000)": mede(lambda: apresenta_linhas(linhas_1000), repeticoes),
+            "apresenta_event": mede(lambda: apresenta_event(event), repeticoes * 10),
+            "json da listagem (1000)": mede(lambda: app.json.dumps(apresenta_linhas(linhas_1000)), repeticoes),
+        }
+    finally:
+        session.close()
+
+
+def executa(tamanho, repeticoes, diretorio):
+    inicio = time.perf_counter()
+    engine = gera_dataset("sqlite:///%s" % os.path.join(diretorio, f"bench-{tamanho}.sqlite3"), tamanho)
+    geracao = time.perf_counter() - inicio
+    Session.configure(bind=engine)
+    try:
+        return {
+            "events": tamanho,
+            "geracao_s": round(geracao, 1),
+            "leituras": leituras(repeticoes),
+            "escritas": escritas(repeticoes),
+            "serializadores": serializadores(repeticoes),
+        }
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS[:2]))
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--com-cache", action="store_true")
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    # o handler de console do logger escreve no stdout, onde sai o JSON do resultado
+    logging.disable(logging.WARNING)
+    if not args.com_cache:
+        cache.configura_listagem_cache(cache.NullCache())
+    resultado = {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cache": args.com_cache,
+        "datasets": [],
+    }
+    with tempfile.TemporaryDirectory() as diretorio:
+        for tamanho in args.tamanhos:
+            resultado["datasets"].append(executa(tamanho, args.repeticoes, diretorio))
+
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            arquivo.write(saida)
+    else:
+        print(saida)
+
+
+if __name__ == "__main__":
+    main()
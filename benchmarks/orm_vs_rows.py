@@ -0,0 +1,96 @@
+"""
+Compara a listagem de events montada a partir de instâncias ORM (session.query(Event)
++ apresenta_events) com o caminho somente leitura por colunas (consulta_listagem +
+apresenta_linhas), medindo CPU por linha e pico de memória.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.orm_vs_rows [--events 100000]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from model import Base, Event
+from model.database import cria_engine
+from schemas.event import EventListagemBuscaSchema, apresenta_events
+from services.event import apresenta_listagem, consulta_listagem
+
+
+def popula(engine, quantidade):
+    inicio = datetime(2024, 1, 1, 8, 0)
+    linhas = [{
+        "pk_event": str(uuid.uuid4()), "name": f"Consulta {i}", "date": inicio + timedelta(minutes=i),
+        "type": 1, "user_id": "bench", "description": "d" * 120, "observation": "o" * 120,
+        "doctor_name": "Dra. Ana", "location_name": "Clínica", "doctor_id": 1, "location_id": 1,
+    } for i in range(quantidade)]
+    with engine.begin() as conexao:
+        conexao.execute(insert(Event.__table__), linhas)
+
+
+def via_orm(Session, query):
+    session = Session()
+    try:
+        events = session.query(Event).filter(Event.user_id == query.user_id).order_by(Event.date, Event.id).all()
+        return apresenta_events(events)
+    finally:
+        session.close()
+
+
+def via_linhas(Session, query):
+    session = Session()
+    try:
+        linhas = session.execute(consulta_listagem(query, None, None)).all()
+        return apresenta_listagem(query, linhas)[1]
+    finally:
+        session.close()
+
+
+def mede_memoria(funcao, *args):
+    gc.collect()
+    tracemalloc.start()
+    data = funcao(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(data["events"]), pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = cria_engine("sqlite:///%s" % os.path.join(diretorio, "bench.sqlite3"))
+        Base.metadata.create_all(engine)
+        popula(engine, args.events)
+        Session = sessionmaker(bind=engine)
+        query = EventListagemBuscaSchema(user_id="bench")
+
+        for nome, funcao in (("orm", via_orm), ("linhas", via_linhas)):
+            # tracemalloc torna tudo mais lento; o CPU é medido numa execução separada
+            total, pico = mede_memoria(funcao, Session, query)
+            inicio = time.process_time()
+            funcao(Session, query)
+            cpu = time.process_time() - inicio
+            print(json.dumps({
+                "caminho": nome, "events": total,
+                "cpu_us_por_linha": round(cpu / total * 1e6, 2),
+                "pico_memoria_mb": round(pico / 1024 / 1024, 1),
+            }))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
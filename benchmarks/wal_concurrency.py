@@ -0,0 +1,110 @@
+"""
+Mede a latência de leitores concorrentes enquanto um escritor grava events em
+lotes, comparando o journal padrão do sqlite (DELETE) com WAL.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.wal_concurrency [--segundos 5] [--leitores 4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert, select
+
+from model import Base, Event
+from model.database import cria_engine, pragmas_sqlite
+from benchmarks.metricas import percentil
+
+
+def escritor(db_url, pragmas, fim, linhas_por_lote, resultado):
+    engine = cria_engine(db_url, pragmas=pragmas)
+    lotes = 0
+    while time.time() < fim:
+        linhas = [{
+            "pk_event": str(uuid.uuid4()), "name": None, "date": datetime.now(), "type": 1,
+            "user_id": "bench", "description": "x" * 200, "observation": "y" * 200,
+        } for _ in range(linhas_por_lote)]
+        with engine.begin() as conexao:
+            conexao.execute(insert(Event.__table__), linhas)
+        lotes += 1
+    engine.dispose()
+    resultado.put(("lotes", lotes))
+
+
+def leitor(db_url, pragmas, fim, resultado):
+    engine = cria_engine(db_url, pragmas=pragmas)
+    latencias = []
+    erros = 0
+    while time.time() < fim:
+        inicio = time.perf_counter()
+        try:
+            with engine.connect() as conexao:
+                # consulta indexada e barata: a latência medida é a espera pelo lock
+                conexao.execute(
+                    select(Event.id).where(Event.user_id == "bench").order_by(Event.date).limit(50)
+                ).all()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        except Exception:
+            erros += 1
+    engine.dispose()
+    resultado.put(("leitor", latencias, erros))
+
+
+def executa(journal_mode, segundos, leitores, linhas_por_lote):
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_url = "sqlite:///%s/concorrencia.sqlite3" % diretorio
+        pragmas = dict(pragmas_sqlite(), journal_mode=journal_mode)
+        engine = cria_engine(db_url, pragmas=pragmas)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+
+        # processos separados, como workers do gunicorn, para não medir a disputa pelo GIL
+        resultado = multiprocessing.Queue()
+        fim = time.time() + segundos
+        processos = [multiprocessing.Process(target=escritor, args=(db_url, pragmas, fim, linhas_por_lote, resultado))]
+        processos += [multiprocessing.Process(target=leitor, args=(db_url, pragmas, fim, resultado)) for _ in range(leitores)]
+        for processo in processos:
+            processo.start()
+        mensagens = [resultado.get() for _ in processos]
+        for processo in processos:
+            processo.join()
+
+    lotes = sum(m[1] for m in mensagens if m[0] == "lotes")
+    latencias = [latencia for m in mensagens if m[0] == "leitor" for latencia in m[1]]
+    erros = sum(m[2] for m in mensagens if m[0] == "leitor")
+    return {
+        "journal_mode": journal_mode,
+        "lotes_gravados": lotes,
+        "leituras": len(latencias),
+        "erros_leitura": erros,
+        "leitura_p50_ms": round(statistics.median(latencias), 3) if latencias else None,
+        "leitura_p99_ms": round(percentil(latencias, 0.99), 3) if latencias else None,
+        "leitura_max_ms": round(max(latencias), 3) if latencias else None,
+        "leituras_acima_de_10ms": sum(1 for latencia in latencias if latencia > 10),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--leitores", type=int, default=4)
+    parser.add_argument("--linhas-por-lote", type=int, default=5000)
+    args = parser.parse_args()
+    resultados = [
+        executa(modo, args.segundos, args.leitores, args.linhas_por_lote)
+        for modo in ("DELETE", "WAL")
+    ]
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
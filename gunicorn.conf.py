@@ -0,0 +1,75 @@
+"""
+Configuração do gunicorn para produção:
+    gunicorn --config gunicorn.conf.py app:app
+
+Todos os valores podem ser trocados por variáveis de ambiente (GUNICORN_*).
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:%s" % os.getenv("PORT", "5000"))
+
+# processos e threads por processo; com mais de uma thread o worker é o gthread
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+
+# importa a aplicação (models, schemas, spec do OpenAPI) uma única vez no master;
+# os workers herdam tudo já carregado via fork
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# recicla cada worker após N requisições (0 desabilita); o jitter evita que todos
+# os workers sejam reiniciados ao mesmo tempo
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+# diretório em que cada worker grava as métricas do Prometheus (services.metrics);
+# precisa existir antes de o app (preload) importar o prometheus_client
+METRICAS_DIR_PADRAO = os.path.join(tempfile.gettempdir(), "appointments-metrics")
+metricas_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", METRICAS_DIR_PADRAO)
+os.makedirs(metricas_dir, exist_ok=True)
+
+
+def on_starting(server):
+    # descarta as métricas de uma execução anterior. Roda uma vez, no início do master:
+    # este módulo é importado de novo a cada SIGHUP, com os workers ainda gravando no
+    # diretório. Um diretório escolhido pelo operador não é apagado
+    if metricas_dir == METRICAS_DIR_PADRAO:
+        shutil.rmtree(metricas_dir, ignore_errors=True)
+        os.makedirs(metricas_dir, exist_ok=True)
+
+
+def when_ready(server):
+    # gera a spec do OpenAPI no master, antes do fork, para que nenhum worker
+    # precise montá-la na primeira requisição à documentação
+    if preload_app:
+        from app import app
+        app.api_doc
+
+
+def post_fork(server, worker):
+    # as conexões herdadas do master não podem ser usadas no worker
+    from model import engine
+    from model.database import descarta_pool_pos_fork
+    from services.readiness import aquece_banco
+
+    descarta_pool_pos_fork(engine)
+    aquece_banco()
+
+
+def child_exit(server, worker):
+    # os gauges "live" (ex.: conexões do pool) deixam de contar o worker encerrado
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,86 @@
+"""
+Provider JSON do app: usa o orjson quando instalado e o provider padrão do Flask
+(json da stdlib) caso contrário, ou quando JSON_PROVIDER=stdlib.
+
+JSON_DATETIME_FORMAT escolhe o formato das datas: "http" (padrão, o mesmo do Flask,
+ex.: "Fri, 01 Mar 2024 10:00:00 GMT") ou "iso" (ex.: "2024-03-01T10:00:00"),
+este serializado nativamente pelo orjson, sem callback em Python.
+"""
+import os
+from datetime import datetime, timezone
+
+from flask.json.provider import DefaultJSONProvider
+
+from logger import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_DIAS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MESES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def data_http(valor) -> str:
+    """
+    Mesmo resultado do werkzeug.http.http_date para um datetime (sem fuso é tratado
+    como UTC), montado diretamente em vez de passar por email.utils.
+    """
+    if valor.tzinfo is not None:
+        valor = valor.astimezone(timezone.utc)
+    return (f"{_DIAS[valor.weekday()]}, {valor.day:02d} {_MESES[valor.month - 1]} {valor.year:04d} "
+            f"{valor.hour:02d}:{valor.minute:02d}:{valor.second:02d} GMT")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Serializa com o orjson. datetime, date, Enum, UUID e dataclasses são tratados
+    nativamente; os demais tipos (ex.: Decimal) caem no _default do Flask.
+    """
+    formato_data = "http"
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.formato_data = os.getenv("JSON_DATETIME_FORMAT", "http").lower()
+
+    def _opcoes(self, indent=False) -> int:
+        opcoes = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        if indent:
+            opcoes |= orjson.OPT_INDENT_2
+        if self.formato_data != "iso":
+            # as datas passam pelo callback para manter o formato HTTP do Flask
+            opcoes |= orjson.OPT_PASSTHROUGH_DATETIME
+        return opcoes
+
+    def _default_orjson(self, o):
+        if self.formato_data != "iso" and isinstance(o, datetime):
+            return data_http(o)
+        return self.default(o)
+
+    def _serializa(self, obj, indent=False) -> bytes:
+        return orjson.dumps(obj, default=self._default_orjson, option=self._opcoes(indent))
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self._serializa(obj, indent=bool(kwargs.get("indent"))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # os bytes do orjson vão direto para a resposta, sem passar por str
+        return self._app.response_class(self._serializa(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def configura_json(app):
+    """Troca o provider JSON do app pelo OrjsonProvider, se disponível."""
+    if orjson is None or os.getenv("JSON_PROVIDER", "orjson").lower() == "stdlib":
+        logger.info("Usando o provider JSON padrão do Flask")
+        return
+    app.json_provider_class = OrjsonProvider
+    app.json = OrjsonProvider(app)
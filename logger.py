@@ -1,6 +1,10 @@
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 import logging
 import os
+import queue
+import threading
 
 
 log_path = "log/"
@@ -41,16 +45,16 @@ dictConfig({
             "class": "logging.handlers.RotatingFileHandler",
             "formatter": "detailed",
             "filename": "log/gunicorn.error.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
+            "maxBytes": int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            "backupCount": int(os.getenv("LOG_BACKUP_COUNT", "10")),
             "delay": "True",
         },
         "detailed_file": {
             "class": "logging.handlers.RotatingFileHandler",
             "formatter": "detailed",
             "filename": "log/gunicorn.detailed.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
+            "maxBytes": int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            "backupCount": int(os.getenv("LOG_BACKUP_COUNT", "10")),
             "delay": "True",
         }
     },
@@ -68,4 +72,88 @@ dictConfig({
 })
 
 
+class FilaHandler(QueueHandler):
+    """
+    QueueHandler que nunca bloqueia quem registra o log: se a fila estiver cheia o
+    registro é descartado e contabilizado em 'descartados'.
+    """
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+        self._lock_descartados = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock_descartados:
+                self.descartados += 1
+
+
+class FilaListener(QueueListener):
+    def enqueue_sentinel(self):
+        # o sentinela precisa entrar mesmo com a fila cheia, senão stop() não termina
+        self.queue.put(self._sentinel)
+
+
+# pares (handler da fila, listener) de cada logger configurado acima
+_filas = []
+
+
+def _inicia_fila(nome_logger):
+    """
+    Move os handlers do logger para um QueueListener, deixando no logger apenas um
+    FilaHandler: a thread que registra o log só enfileira, e a escrita em arquivo e
+    a rotação acontecem na thread do listener.
+    """
+    alvo = logging.getLogger(nome_logger)
+    handlers = alvo.handlers[:]
+    fila_handler = FilaHandler(queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    listener = FilaListener(fila_handler.queue, *handlers, respect_handler_level=True)
+    alvo.handlers = [fila_handler]
+    listener.start()
+    _filas.append((fila_handler, listener))
+
+
+def _retoma_filas():
+    for _, listener in _filas:
+        if listener._thread is None:
+            listener.start()
+
+
+def _reinicia_filas_pos_fork():
+    # a thread do listener não existe no processo filho (ex.: workers do gunicorn);
+    # cada filho recebe filas novas e o próprio listener
+    for fila_handler, listener in _filas:
+        fila_handler.queue = queue.Queue(fila_handler.queue.maxsize)
+        fila_handler.descartados = 0
+        # um fork feito enquanto outra thread segurava o lock deixaria o filho travado
+        fila_handler._lock_descartados = threading.Lock()
+        listener.queue = fila_handler.queue
+        listener._thread = None
+        listener.start()
+
+
+def para_filas():
+    """Esvazia as filas de log, gravando os registros pendentes."""
+    for _, listener in _filas:
+        if listener._thread is not None:
+            listener.stop()
+
+
+def registros_descartados() -> int:
+    """Total de registros de log descartados por fila cheia neste processo."""
+    return sum(fila_handler.descartados for fila_handler, _ in _filas)
+
+
+if os.getenv("LOG_QUEUE", "true").lower() == "true":
+    for nome_logger in ("gunicorn.error", None):
+        _inicia_fila(nome_logger)
+    # o listener é parado antes de cada fork: se a thread dele estivesse no meio de
+    # uma escrita, o filho herdaria travados os locks do handler e do stdout
+    os.register_at_fork(before=para_filas, after_in_parent=_retoma_filas,
+                        after_in_child=_reinicia_filas_pos_fork)
+    atexit.register(para_filas)
+
+
 logger = logging.getLogger(__name__)
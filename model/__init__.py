@@ -1,6 +1,5 @@
 from sqlalchemy_utils import database_exists, create_database
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 import os
 
 # importando os elementos definidos no modelo
@@ -9,22 +8,16 @@ from model.comentario import Comentario
 from model.event import Event
 from model.location import Location
 from model.doctor import Doctor
+from model.user_version import UserVersion
+from model.database import cria_engine, descarta_pool_pos_fork
+from model.migration import adiciona_colunas_ausentes, cria_indices_ausentes
+from model.fts import cria_fts
 
-db_path = "database/"
-# Verifica se o diretorio não existe
-if not os.path.exists(db_path):
-   # então cria o diretorio
-   os.makedirs(db_path)
+# cria a engine de conexão com o banco, configurada pelas variáveis de ambiente
+engine = cria_engine()
 
-# url de acesso ao banco (essa é uma url de acesso ao sqlite local)
-db_url = 'sqlite:///%s/db.sqlite3' % db_path
-
-# cria a engine de conexão com o banco
-engine = create_engine(
-    db_url, 
-    echo=False,
-    connect_args={'check_same_thread': False},
-)
+# cada processo filho (ex.: workers do gunicorn) abre as próprias conexões
+os.register_at_fork(after_in_child=lambda: descarta_pool_pos_fork(engine))
 
 # Instancia um criador de seção com o banco
 Session = sessionmaker(bind=engine)
@@ -35,3 +28,10 @@ if not database_exists(engine.url):
 
 # cria as tabelas do banco, caso não existam
 Base.metadata.create_all(engine)
+
+# cria as colunas e os índices declarados que ainda não existem em bancos antigos
+adiciona_colunas_ausentes(engine)
+cria_indices_ausentes(engine)
+
+# cria e popula o índice de busca textual (sqlite FTS5) em bancos que ainda não o têm
+cria_fts(engine)
@@ -0,0 +1,11 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from model.database import cria_engine_async
+
+# engine e sessões do modo ASGI (asgi.py). Ficam fora de model/__init__ para que o
+# modo WSGI não dependa dos drivers assíncronos (aiosqlite/asyncpg).
+engine_async = cria_engine_async()
+
+# expire_on_commit=False: numa session assíncrona não há lazy load implícito, então
+# os objetos precisam continuar legíveis após o commit
+SessionAsync = async_sessionmaker(bind=engine_async, expire_on_commit=False)
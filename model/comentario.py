@@ -17,9 +17,11 @@ class Comentario(Base):
     # Aqui está sendo definido a coluna 'event' que vai guardar
     # a referencia ao event, a chave estrangeira que relaciona
     # um event ao comentário.
-    event = Column(Integer, ForeignKey("event.pk_event"), nullable=True)
-    doctor = Column(Integer, ForeignKey("doctor.pk_doctor"), nullable=True)
-    location = Column(Integer, ForeignKey("location.pk_location"), nullable=True)
+    # As chaves estrangeiras são indexadas para que a carga e a contagem dos
+    # comentários de vários events seja feita sem varrer a tabela.
+    event = Column(Integer, ForeignKey("event.pk_event"), nullable=True, index=True)
+    doctor = Column(Integer, ForeignKey("doctor.pk_doctor"), nullable=True, index=True)
+    location = Column(Integer, ForeignKey("location.pk_location"), nullable=True, index=True)
 
     def __init__(self, texto:str, data_insercao:Union[DateTime, None] = None):
         """
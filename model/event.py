@@ -1,5 +1,5 @@
 # from schemas.event import EventType
-from sqlalchemy import Column, String, Integer, DateTime, Float, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import Union
@@ -14,8 +14,24 @@ class EventType(Enum):
     CONSULTATION = 1
     EXAM = 2
 
+# Maior duração aceita para um event. Limita a janela da busca por conflitos:
+# um event que começou antes de 'inicio - DURACAO_MAXIMA_MINUTOS' não pode sobrepor.
+DURACAO_MAXIMA_MINUTOS = 24 * 60
+
 class Event(Base):
     __tablename__ = 'event'
+    # Índices compostos usados pelo EventService. O (user_id, date, pk_event) atende
+    # a listagem paginada por usuário sem ordenação em memória; (user_id, pk_event)
+    # atende remoção/atualização por id + user_id. Bancos já existentes recebem os
+    # índices através de model.migration.cria_indices_ausentes.
+    __table_args__ = (
+        Index("ix_event_user_date", "user_id", "date", "pk_event"),
+        Index("ix_event_user_id", "user_id", "pk_event"),
+        Index("ix_event_date", "date", "pk_event"),
+        Index("ix_event_doctor_date", "doctor_id", "date"),
+        Index("ix_event_location_date", "location_id", "date"),
+        Index("ix_event_fts_id", "fts_id", unique=True),
+    )
 
     id = Column("pk_event", String(36), primary_key=True)
     # Alterado para String para armazenar UUID (ex.: "54e8a4a8-5001-7018-8eec-ce6b634cded9")
@@ -27,6 +43,9 @@ class Event(Base):
     observation = Column(String(255), unique=False)
     type = Column(Integer)
     date = Column(DateTime, default=datetime.now, unique=False)
+    # Duração opcional em minutos; quando informada o event ocupa a agenda do
+    # doctor e do location entre 'date' e 'date + duration_minutes'.
+    duration_minutes = Column(Integer, nullable=True)
     data_insercao = Column(DateTime, default=datetime.now)
     doctor_name = Column(String(140), unique=False)
     location_name = Column(String(140), unique=False)
@@ -34,6 +53,9 @@ class Event(Base):
     # Location e doctor não são obrigatórios, porém user_id é obrigatório.
     location_id = Column(Integer, ForeignKey("location.pk_location"), nullable=True)
     doctor_id = Column(Integer, ForeignKey("doctor.pk_doctor"), nullable=True)
+    # Chave do event no índice de busca textual (model.fts). Preenchida pelo trigger
+    # de INSERT do sqlite; ao contrário do rowid, não muda com VACUUM ou restore.
+    fts_id = Column(Integer, nullable=True)
         
     # Definição do relacionamento entre o event e o comentário.
     # Essa relação é implícita, não está salva na tabela 'event',
@@ -53,6 +75,7 @@ class Event(Base):
                  location_id: Union[int, None] = None,
                  doctor_id: Union[int, None] = None,
                  user_id: Union[str, None] = None,
+                 duration_minutes: Union[int, None] = None,
                  data_insercao: Union[datetime, None] = None):
         """
         Cria um Event
@@ -68,6 +91,7 @@ class Event(Base):
             location_id: localização do event.
             doctor_id: doutor relacionado ao event, caso seja tipo consulta.
             user_id: id do usuário que criou o event (agora um UUID em formato string).
+            duration_minutes: duração do event em minutos, usada na verificação de conflitos.
             data_insercao: data de quando o event foi inserido à base.
         """
         self.id = id
@@ -81,6 +105,7 @@ class Event(Base):
         self.location_id = location_id
         self.doctor_id = doctor_id
         self.user_id = user_id or "default_user_id"
+        self.duration_minutes = duration_minutes
 
         # Se não for informada, será a data exata da inserção no banco.
         if data_insercao:
@@ -0,0 +1,126 @@
+"""
+Índice de busca textual dos events (sqlite FTS5).
+
+event_fts é uma tabela FTS5 de conteúdo externo: guarda apenas o índice invertido e
+lê o texto da própria tabela event pela coluna event.fts_id (através da view
+event_fts_conteudo). Triggers mantêm o índice em dia em todo INSERT, DELETE e
+UPDATE dos campos textuais, inclusive os feitos em lote pelo EventService. O user_id
+também é indexado para que a busca de um usuário seja resolvida dentro do índice,
+sem percorrer os resultados dos demais.
+
+O índice não usa o rowid da event: sem INTEGER PRIMARY KEY, o VACUUM e o restore
+podem renumerá-lo. O fts_id é uma coluna comum, atribuída pelo trigger de INSERT
+(o maior fts_id + 1) e mantida pelo VACUUM.
+"""
+from sqlalchemy import event, inspect
+
+from logger import logger
+from model.event import Event
+
+
+TABELA_FTS = "event_fts"
+# view que o índice usa como conteúdo: o fts_id da event e o user_id como um único
+# token ("u" + hex), para que o filtro por usuário seja uma busca exata no índice
+# em vez de uma frase com as partes do user_id (ex.: "user", "a")
+VIEW_CONTEUDO = "event_fts_conteudo"
+# colunas indexadas, na ordem da tabela virtual (os pesos do bm25 seguem essa ordem)
+COLUNAS_FTS = ("user_id", "name", "description", "observation", "doctor_name", "location_name")
+COLUNAS_TEXTO = COLUNAS_FTS[1:]
+
+_colunas = ", ".join(COLUNAS_FTS)
+_textos = ", ".join(COLUNAS_TEXTO)
+_novos = ", ".join(["'u' || hex(new.user_id)"] + ["new.%s" % coluna for coluna in COLUNAS_TEXTO])
+_antigos = ", ".join(["'u' || hex(old.user_id)"] + ["old.%s" % coluna for coluna in COLUNAS_TEXTO])
+
+DDL_FTS = (
+    f"CREATE VIEW IF NOT EXISTS {VIEW_CONTEUDO} AS "
+    f"SELECT fts_id AS id_fts, 'u' || hex(user_id) AS user_id, {_textos} FROM event",
+    # remove_diacritics: "cardiologia" encontra "Cardiología". prefix: índices para
+    # buscas por prefixo de 2 a 8 letras; sem eles o FTS5 monta a lista completa dos
+    # events de todos os usuários com o prefixo antes de cruzá-la com o user_id
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5({_colunas}, content='{VIEW_CONTEUDO}', "
+    f"content_rowid='id_fts', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8')",
+    # o sqlite não permite alterar new.fts_id antes do INSERT: o trigger grava o
+    # fts_id na linha recém-inserida e indexa com ele. Os escritores do sqlite são
+    # serializados, então max + 1 (lido no índice ix_event_fts_id) não se repete
+    f"CREATE TRIGGER IF NOT EXISTS event_fts_ai AFTER INSERT ON event BEGIN "
+    f"UPDATE event SET fts_id = (SELECT coalesce(max(fts_id), 0) + 1 FROM event) "
+    f"WHERE rowid = new.rowid AND new.fts_id IS NULL; "
+    f"INSERT INTO {TABELA_FTS}(rowid, {_colunas}) "
+    f"VALUES ((SELECT fts_id FROM event WHERE rowid = new.rowid), {_novos}); END",
+    f"CREATE TRIGGER IF NOT EXISTS event_fts_ad AFTER DELETE ON event BEGIN "
+    f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, {_colunas}) VALUES ('delete', old.fts_id, {_antigos}); END",
+    # só UPDATEs dos campos indexados reescrevem o índice (ex.: mudar a data não)
+    f"CREATE TRIGGER IF NOT EXISTS event_fts_au AFTER UPDATE OF {_colunas} ON event BEGIN "
+    f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, {_colunas}) VALUES ('delete', old.fts_id, {_antigos}); "
+    f"INSERT INTO {TABELA_FTS}(rowid, {_colunas}) VALUES (new.fts_id, {_novos}); END",
+)
+
+# remove o índice da versão chaveada pelo rowid da event
+DROP_FTS = (
+    "DROP TRIGGER IF EXISTS event_fts_ai",
+    "DROP TRIGGER IF EXISTS event_fts_ad",
+    "DROP TRIGGER IF EXISTS event_fts_au",
+    f"DROP TABLE IF EXISTS {TABELA_FTS}",
+    f"DROP VIEW IF EXISTS {VIEW_CONTEUDO}",
+)
+
+# numera os events ainda sem fts_id a partir do maior já atribuído
+PREENCHE_FTS_ID = (
+    "UPDATE event SET fts_id = rowid + (SELECT coalesce(max(fts_id), 0) FROM event) "
+    "WHERE fts_id IS NULL"
+)
+
+
+def token_usuario(user_id: str) -> str:
+    """Token do user_id no índice, igual ao 'u' || hex(user_id) da view e dos triggers."""
+    return "u" + user_id.encode().hex()
+
+
+def fts_suportado(engine) -> bool:
+    """A busca textual só existe no sqlite."""
+    return engine.dialect.name == "sqlite"
+
+
+def _cria(conexao):
+    for comando in DDL_FTS:
+        conexao.exec_driver_sql(comando)
+
+
+def reconstroi_fts(engine):
+    """Reindexa todos os events a partir da tabela event."""
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql(f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')")
+
+
+def cria_fts(engine):
+    """
+    Cria o índice e os triggers em bancos que ainda não os têm (o create_all só os
+    cria junto com a tabela event) e indexa os events já existentes. Um índice da
+    versão chaveada pelo rowid é recriado sobre o fts_id.
+    Retorna True se o índice foi criado agora.
+    """
+    if not fts_suportado(engine):
+        return False
+    with engine.begin() as conexao:
+        definicao = conexao.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", (VIEW_CONTEUDO,)
+        ).scalar()
+        if definicao is not None and "fts_id" in definicao:
+            return False
+        if definicao is None:
+            logger.info(f"Criando o índice de busca textual '{TABELA_FTS}'")
+        else:
+            logger.info(f"Recriando o índice de busca textual '{TABELA_FTS}' sobre event.fts_id")
+            for comando in DROP_FTS:
+                conexao.exec_driver_sql(comando)
+        conexao.exec_driver_sql(PREENCHE_FTS_ID)
+        _cria(conexao)
+    reconstroi_fts(engine)
+    return True
+
+
+@event.listens_for(Event.__table__, "after_create")
+def _cria_com_tabela(tabela, conexao, **kw):
+    if conexao.dialect.name == "sqlite":
+        _cria(conexao)
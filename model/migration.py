@@ -0,0 +1,57 @@
+from sqlalchemy import inspect
+
+from logger import logger
+from model.base import Base
+
+
+def adiciona_colunas_ausentes(engine):
+    """
+    Adiciona às tabelas existentes as colunas declaradas nos modelos que ainda não
+    existem no banco, pelo mesmo motivo de cria_indices_ausentes. Só colunas que
+    aceitam nulo podem ser adicionadas assim, já que as linhas antigas ficam sem valor.
+    Retorna a lista com as colunas adicionadas no formato "tabela.coluna".
+    """
+    inspector = inspect(engine)
+    tabelas = set(inspector.get_table_names())
+    adicionadas = []
+    for tabela in Base.metadata.sorted_tables:
+        if tabela.name not in tabelas:
+            continue
+        existentes = {coluna["name"] for coluna in inspector.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name in existentes:
+                continue
+            if not coluna.nullable:
+                logger.warning(f"Coluna '{tabela.name}.{coluna.name}' não aceita nulo e precisa ser criada manualmente")
+                continue
+            logger.info(f"Adicionando coluna ausente '{coluna.name}' na tabela '{tabela.name}'")
+            tipo = coluna.type.compile(dialect=engine.dialect)
+            with engine.begin() as conexao:
+                conexao.exec_driver_sql(f"ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}")
+            adicionadas.append(f"{tabela.name}.{coluna.name}")
+    return adicionadas
+
+
+def cria_indices_ausentes(engine):
+    """
+    Cria os índices declarados nos modelos que ainda não existem no banco.
+
+    O Base.metadata.create_all só cria índices junto com a tabela, então bancos
+    criados antes de um índice ser declarado nunca o recebem. Esta função
+    compara os índices declarados com os existentes e cria apenas os que faltam.
+    Retorna a lista com o nome dos índices criados.
+    """
+    inspector = inspect(engine)
+    tabelas = set(inspector.get_table_names())
+    criados = []
+    for tabela in Base.metadata.sorted_tables:
+        if tabela.name not in tabelas:
+            continue
+        existentes = {indice["name"] for indice in inspector.get_indexes(tabela.name)}
+        for indice in tabela.indexes:
+            if indice.name in existentes:
+                continue
+            logger.info(f"Criando índice ausente '{indice.name}' na tabela '{tabela.name}'")
+            indice.create(bind=engine)
+            criados.append(indice.name)
+    return criados
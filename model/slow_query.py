@@ -0,0 +1,150 @@
+"""
+Log de consultas lentas: todo comando SQL que passar de SLOW_QUERY_MS (padrão 200;
+valores negativos desligam) é registrado com o SQL normalizado, o formato dos
+parâmetros, a duração e o método dos services que o emitiu.
+
+No sqlite e no postgresql o registro traz também o plano de execução (EXPLAIN QUERY
+PLAN / EXPLAIN), capturado no máximo uma vez a cada SLOW_QUERY_EXPLAIN_INTERVAL
+segundos (padrão 300) para cada SQL normalizado.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+
+from logger import logger
+
+
+_SERVICES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "services")
+
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACOS = re.compile(r"\s+")
+
+
+def normaliza_sql(statement: str) -> str:
+    """
+    Troca literais e placeholders por '?', reduz listas de IN a '(?...)' e compacta
+    os espaços, para que execuções do mesmo comando tenham o mesmo texto.
+    """
+    sql = _LITERAIS.sub("?", statement)
+    sql = _LISTAS.sub("(?...)", sql)
+    return _ESPACOS.sub(" ", sql).strip()
+
+
+def formato_parametros(parameters, executemany: bool = False):
+    """Tipos dos parâmetros, sem os valores (que podem conter dados pessoais)."""
+    if executemany:
+        parameters = list(parameters)
+        return {"execucoes": len(parameters),
+                "parametros": formato_parametros(parameters[0]) if parameters else None}
+    if isinstance(parameters, dict):
+        return {chave: type(valor).__name__ for chave, valor in parameters.items()}
+    return [type(valor).__name__ for valor in parameters or ()]
+
+
+def _nome_qualificado(frame):
+    # co_qualname só existe a partir do python 3.11; a classe é procurada entre as
+    # classes do módulo do frame, pelo objeto de código do método
+    codigo = frame.f_code
+    for valor in list(frame.f_globals.values()):
+        if not isinstance(valor, type):
+            continue
+        membro = vars(valor).get(codigo.co_name)
+        funcao = getattr(membro, "__func__", membro)
+        if getattr(funcao, "__code__", None) is codigo:
+            return "%s.%s" % (valor.__name__, codigo.co_name)
+    return codigo.co_name
+
+
+def metodo_chamador():
+    """Primeiro frame da pilha dentro de services/ (ex.: services/event.py:EventService.get_events)."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        arquivo = frame.f_code.co_filename
+        if arquivo.startswith(_SERVICES_DIR):
+            relativo = os.path.relpath(arquivo, os.path.dirname(_SERVICES_DIR))
+            return "%s:%s" % (relativo, _nome_qualificado(frame))
+        frame = frame.f_back
+    return None
+
+
+def _plano(conn, statement, parameters):
+    dialeto = conn.dialect.name
+    if dialeto == "sqlite":
+        prefixo = "EXPLAIN QUERY PLAN "
+    elif dialeto == "postgresql":
+        prefixo = "EXPLAIN "
+    else:
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        if dialeto == "postgresql":
+            # um EXPLAIN com erro não pode abortar a transação da requisição
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(prefixo + statement, parameters)
+            linhas = cursor.fetchall()
+        except Exception as e:
+            if dialeto == "postgresql":
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return ["EXPLAIN falhou: %s" % e]
+        if dialeto == "postgresql":
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return [linha[0] for linha in linhas]
+        # (id, parent, notused, detail)
+        return [linha[-1] for linha in linhas]
+    finally:
+        cursor.close()
+
+
+def configura_slow_query(engine, limite_ms: float = None, intervalo_explain: float = None):
+    """Registra na engine (síncrona) os eventos que medem cada comando SQL."""
+    if limite_ms is None:
+        limite_ms = float(os.getenv("SLOW_QUERY_MS", "200"))
+    if limite_ms < 0:
+        return
+    if intervalo_explain is None:
+        intervalo_explain = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+    limite = limite_ms / 1000
+    # fingerprint -> momento do último EXPLAIN capturado
+    ultimos_explain = {}
+    lock = threading.Lock()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def inicia_comando(conn, cursor, statement, parameters, context, executemany):
+        # guardado no contexto da execução: um comando que falha não deixa resíduo
+        context.slow_query_inicio = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def finaliza_comando(conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "slow_query_inicio", None)
+        if inicio is None:
+            return
+        duracao = time.perf_counter() - inicio
+        if duracao < limite:
+            return
+
+        sql = normaliza_sql(statement)
+        fingerprint = hashlib.sha1(sql.encode()).hexdigest()[:12]
+        registro = {
+            "fingerprint": fingerprint,
+            "duracao_ms": round(duracao * 1000, 2),
+            "sql": sql,
+            "parametros": formato_parametros(parameters, executemany),
+            "chamador": metodo_chamador(),
+        }
+        agora = time.monotonic()
+        with lock:
+            ultimo = ultimos_explain.get(fingerprint)
+            explica = not executemany and (ultimo is None or agora - ultimo >= intervalo_explain)
+            if explica:
+                ultimos_explain[fingerprint] = agora
+        if explica and sql.split(" ", 1)[0].upper() in ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT"):
+            registro["plano"] = _plano(conn, statement, parameters)
+        logger.warning("slow_query %s", json.dumps(registro))
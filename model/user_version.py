@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Integer
+
+from model import Base
+
+
+class UserVersion(Base):
+    __tablename__ = 'user_version'
+
+    # Versão dos events de cada usuário, incrementada a cada escrita do EventService
+    # na mesma transação da alteração. Fica no banco (e não em memória) para que
+    # todos os workers enxerguem a mesma versão ao validar ETags.
+    user_id = Column(String(36), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __init__(self, user_id: str, version: int = 0):
+        """
+        Cria um UserVersion
+
+        Arguments:
+            user_id: id do usuário dono dos events.
+            version: contador de alterações nos events do usuário.
+        """
+        self.user_id = user_id
+        self.version = version
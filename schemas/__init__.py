@@ -1,11 +1,17 @@
 from schemas.comentario import ComentarioSchema
-from schemas.event import EventSchema, EventBuscaSchema, EventViewSchema, \
-                            ListagemEventsSchema, EventDelSchema, apresenta_events, \
-                            apresenta_event, apresenta_events
+from schemas.event import EventSchema, EventBuscaSchema, EventDetalheBuscaSchema, EventViewSchema, \
+                            EventBatchSchema, EventBatchItemSchema, EventBatchViewSchema, \
+                            EventPatchSchema, EventBulkDelSchema, EventBulkUpdateSchema, EventBulkViewSchema, \
+                            EventListagemBuscaSchema, EventProximosBuscaSchema, EventExportBuscaSchema, \
+                            EventPesquisaBuscaSchema, \
+                            EventCalendarioBuscaSchema, EventCalendarioViewSchema, ListagemEventsSchema, \
+                            EventDelSchema, apresenta_events, apresenta_linhas, apresenta_event, apresenta_event_resumo
 from schemas.doctor import DoctorSchema, DoctorBuscaSchema, DoctorViewSchema, \
                             ListagemDoctorsSchema, DoctorDelSchema, apresenta_doctors, \
                             apresenta_doctor, apresenta_doctors
 from schemas.location import LocationSchema, LocationBuscaSchema, LocationViewSchema, \
                             ListagemLocationsSchema, LocationDelSchema, apresenta_locations, \
                             apresenta_location, apresenta_locations
+from schemas.availability import AvailabilityBuscaSchema, AgendaLivreSchema, AvailabilityViewSchema, \
+                            apresenta_availability
 from schemas.error import ErrorSchema
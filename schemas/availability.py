@@ -0,0 +1,66 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List
+from datetime import datetime, time
+import os
+
+
+# Expediente padrão usado quando a busca não informa work_start/work_end
+EXPEDIENTE_INICIO = time.fromisoformat(os.getenv("EXPEDIENTE_INICIO", "08:00"))
+EXPEDIENTE_FIM = time.fromisoformat(os.getenv("EXPEDIENTE_FIM", "18:00"))
+
+# Limites da busca, para que uma única requisição não gere milhões de horários
+JANELA_MAXIMA_DIAS = 92
+AGENDAS_MAXIMAS = 200
+
+
+class AvailabilityBuscaSchema(BaseModel):
+    """
+    Define os parâmetros da busca por horários livres de um ou mais doctors/locations.
+    Para buscar várias agendas de uma vez repita o parâmetro: ?doctor_id=1&doctor_id=2.
+    "from" é inclusivo e "to" exclusivo; "work_days" usa 0 para segunda e 6 para domingo.
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    doctor_id: List[int] = Field([], max_length=AGENDAS_MAXIMAS)
+    location_id: List[int] = Field([], max_length=AGENDAS_MAXIMAS)
+    from_: datetime = Field(datetime(2024, 5, 6, 0, 0), alias="from")
+    to: datetime = datetime(2024, 5, 11, 0, 0)
+    slot_minutes: int = Field(30, ge=5, le=8 * 60)
+    work_start: time = EXPEDIENTE_INICIO
+    work_end: time = EXPEDIENTE_FIM
+    work_days: List[int] = [0, 1, 2, 3, 4]
+    first_only: bool = False
+
+
+class AgendaLivreSchema(BaseModel):
+    """
+    Define os horários livres de uma agenda: "slots" traz o início de cada horário
+    livre de "slot_minutes" minutos e "first_available" o primeiro deles.
+    """
+    doctor_id: Optional[int] = 1
+    location_id: Optional[int] = None
+    first_available: Optional[datetime] = None
+    slots: List[datetime] = []
+
+
+class AvailabilityViewSchema(BaseModel):
+    """
+    Define como o resultado da busca por horários livres será retornado.
+    """
+    slot_minutes: int = 30
+    agendas: List[AgendaLivreSchema]
+
+
+def apresenta_availability(slot_minutes: int, agendas: list):
+    """ Retorna uma representação dos horários livres seguindo o schema definido em
+        AvailabilityViewSchema. Cada agenda é uma tupla (tipo, id, slots).
+    """
+    result = []
+    for tipo, agenda_id, slots in agendas:
+        result.append({
+            "doctor_id": agenda_id if tipo == "doctor" else None,
+            "location_id": agenda_id if tipo == "location" else None,
+            "first_available": slots[0] if slots else None,
+            "slots": slots,
+        })
+    return {"slot_minutes": slot_minutes, "agendas": result}
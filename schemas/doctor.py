@@ -66,10 +66,13 @@ class DoctorDelSchema(BaseModel):
     message: str
     name: str
 
-def apresenta_doctor(doctor: Doctor):
+def apresenta_doctor(doctor: Doctor, comentarios: Optional[list] = None):
     """ Retorna uma representação do doctor seguindo o schema definido em
-        DoctorViewSchema.
+        DoctorViewSchema. Os comentários podem ser informados já carregados;
+        caso contrário são lidos de doctor.comentarios.
     """
+    if comentarios is None:
+        comentarios = doctor.comentarios
     return {
         "id": doctor.id,
         "name": doctor.name,
@@ -77,6 +80,6 @@ def apresenta_doctor(doctor: Doctor):
         "phone": doctor.phone,
         "observation": doctor.observation,
         "location_id": doctor.location_id,
-        "total_cometarios": len(doctor.comentarios),
-        "comentarios": [{"texto": c.texto} for c in doctor.comentarios]
+        "total_cometarios": len(comentarios),
+        "comentarios": [{"texto": c.texto} for c in comentarios]
     }
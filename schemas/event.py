@@ -1,7 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Optional, List, Dict
 from datetime import datetime
-from model.event import Event, EventType
+from model.event import Event, EventType, DURACAO_MAXIMA_MINUTOS
 from enum import Enum
 
 from schemas import ComentarioSchema
@@ -23,6 +23,102 @@ class EventSchema(BaseModel):
     doctor_id: int = 1
     user_id: str = "default_user_id"
     type: EventType = EventType.CONSULTATION
+    duration_minutes: Optional[int] = Field(None, ge=1, le=DURACAO_MAXIMA_MINUTOS)
+
+
+# Campos que podem ser pedidos no parâmetro "fields" das consultas de events
+CAMPOS_EVENT = tuple(EventSchema.model_fields)
+
+
+def valida_campos(valor):
+    """
+    Converte o parâmetro "fields" (ex.: "name,date" ou repetido) na lista de campos
+    a retornar, sempre incluindo "id". Lança ValueError para campos desconhecidos.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        valor = [valor]
+    campos = [campo.strip() for item in valor for campo in item.split(",") if campo.strip()]
+    invalidos = [campo for campo in campos if campo not in CAMPOS_EVENT]
+    if invalidos:
+        raise ValueError(f"Campos inválidos em 'fields': {', '.join(invalidos)}. "
+                         f"Permitidos: {', '.join(CAMPOS_EVENT)}")
+    return list(dict.fromkeys(["id", *campos]))
+
+
+# Quantidade máxima de events aceitos em uma única requisição de criação em lote
+LIMITE_MAXIMO_LOTE = 1000
+
+
+class EventBatchSchema(BaseModel):
+    """
+    Define como uma lista de events a serem inseridos em lote deve ser representada.
+    """
+    events: List[EventSchema] = Field(..., min_length=1, max_length=LIMITE_MAXIMO_LOTE)
+
+
+class EventBatchItemSchema(BaseModel):
+    """
+    Define o resultado de cada item de uma criação em lote. O campo "index" é a
+    posição do item na lista enviada e "status" segue os códigos HTTP (200 ou 409).
+    """
+    index: int = 0
+    status: int = 200
+    msg: str = "Event adicionado com sucesso."
+    data: dict = {}
+
+
+class EventBatchViewSchema(BaseModel):
+    """
+    Define como o resultado de uma criação em lote será retornado.
+    """
+    created: int = 1
+    failed: int = 0
+    results: List[EventBatchItemSchema]
+
+
+class EventPatchSchema(BaseModel):
+    """
+    Define os campos que podem ser alterados em uma atualização em lote.
+    Apenas os campos enviados são alterados.
+    """
+    name: Optional[str] = None
+    description: Optional[str] = None
+    observation: Optional[str] = None
+    date: Optional[datetime] = None
+    doctor_name: Optional[str] = None
+    location_name: Optional[str] = None
+    location_id: Optional[int] = None
+    doctor_id: Optional[int] = None
+    type: Optional[EventType] = None
+    duration_minutes: Optional[int] = Field(None, ge=1, le=DURACAO_MAXIMA_MINUTOS)
+
+
+class EventBulkDelSchema(BaseModel):
+    """
+    Define a lista de ids de events de um usuário a serem removidos em lote.
+    """
+    user_id: str = "54e8a4a8-5001-7018-8eec-ce6b634cded9"
+    ids: List[str] = Field(..., min_length=1, max_length=LIMITE_MAXIMO_LOTE)
+
+
+class EventBulkUpdateSchema(BaseModel):
+    """
+    Define a lista de ids de events de um usuário e as alterações aplicadas a todos eles.
+    """
+    user_id: str = "54e8a4a8-5001-7018-8eec-ce6b634cded9"
+    ids: List[str] = Field(..., min_length=1, max_length=LIMITE_MAXIMO_LOTE)
+    changes: EventPatchSchema
+
+
+class EventBulkViewSchema(BaseModel):
+    """
+    Define como o resultado de uma remoção ou atualização em lote será retornado:
+    os ids afetados e os que não foram encontrados para o usuário.
+    """
+    affected: List[str]
+    not_found: List[str]
 
 
 class EventBuscaSchema(BaseModel):
@@ -34,34 +130,175 @@ class EventBuscaSchema(BaseModel):
     user_id: str = "54e8a4a8-5001-7018-8eec-ce6b634cded9"
 
 
+class EventDetalheBuscaSchema(EventBuscaSchema):
+    """
+    Define a busca de um event, com a projeção opcional "fields" (ex.: fields=name,date).
+    Com "fields" apenas os campos pedidos (e o "id") são lidos e retornados, sem comentários.
+    """
+    fields: Optional[List[str]] = None
+
+    _valida_fields = field_validator("fields", mode="before")(valida_campos)
+
+
+# Quantidade máxima de events retornados em uma única página da listagem
+LIMITE_MAXIMO_PAGINA = 500
+
+
+class EventListagemBuscaSchema(BaseModel):
+    """
+    Define os parâmetros aceitos na listagem de events.
+    Quando "limit" é informado a listagem é paginada por cursor (keyset),
+    ordenada por data e id; o "cursor" é o "next_cursor" da página anterior.
+    "from" (inclusivo) e "to" (exclusivo) restringem o intervalo de datas e
+    "upcoming" retorna apenas events a partir de agora (com precisão de minuto).
+    "fields" restringe as colunas lidas e os campos retornados (ex.: fields=name,date,type).
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    user_id: Optional[str] = None
+    limit: Optional[int] = Field(None, ge=1, le=LIMITE_MAXIMO_PAGINA)
+    cursor: Optional[str] = None
+    with_total_comentarios: bool = False
+    from_: Optional[datetime] = Field(None, alias="from")
+    to: Optional[datetime] = None
+    upcoming: bool = False
+    fields: Optional[List[str]] = None
+
+    _valida_fields = field_validator("fields", mode="before")(valida_campos)
+
+
+class EventProximosBuscaSchema(BaseModel):
+    """
+    Define os parâmetros da busca dos próximos "n" events de um usuário.
+    """
+    user_id: str = "54e8a4a8-5001-7018-8eec-ce6b634cded9"
+    n: int = Field(5, ge=1, le=LIMITE_MAXIMO_PAGINA)
+
+
+class EventPesquisaBuscaSchema(BaseModel):
+    """
+    Define os parâmetros da busca textual nos events de um usuário.
+    "q" é uma lista de palavras (todas precisam aparecer, como prefixo, em name,
+    description, observation, doctor_name ou location_name). O resultado é ordenado
+    por relevância e paginado por "limit" e "cursor" (o "next_cursor" da página anterior).
+    """
+    user_id: str = "54e8a4a8-5001-7018-8eec-ce6b634cded9"
+    q: str = Field(..., min_length=1, max_length=200)
+    limit: int = Field(20, ge=1, le=LIMITE_MAXIMO_PAGINA)
+    cursor: Optional[str] = None
+
+
+class EventExportBuscaSchema(BaseModel):
+    """
+    Define os parâmetros da exportação dos events de um usuário.
+    """
+    user_id: str = "54e8a4a8-5001-7018-8eec-ce6b634cded9"
+
+
+class Granularidade(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class EventCalendarioBuscaSchema(BaseModel):
+    """
+    Define os parâmetros da agregação de events por período.
+    "from" (inclusivo) e "to" (exclusivo) restringem o intervalo de datas.
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    user_id: str = "54e8a4a8-5001-7018-8eec-ce6b634cded9"
+    granularity: Granularidade = Granularidade.DAY
+    from_: Optional[datetime] = Field(None, alias="from")
+    to: Optional[datetime] = None
+
+
+class EventCalendarioViewSchema(BaseModel):
+    """
+    Define como a agregação de events por período será retornada. "buckets" traz a
+    data de início de cada período; "counts" traz, para cada tipo de event, a
+    quantidade em cada período, na mesma posição de "buckets".
+    """
+    granularity: Granularidade = Granularidade.DAY
+    buckets: List[str] = ["2024-01-01", "2024-01-02"]
+    counts: Dict[str, List[int]] = {"CONSULTATION": [1, 0], "EXAM": [0, 2]}
+    total: List[int] = [1, 2]
+
+
 class ListagemEventsSchema(BaseModel):
     """
     Define como uma listagem de events será retornada.
+    O campo "next_cursor" é nulo quando não existem mais páginas.
     """
     events: List[EventSchema]
+    next_cursor: Optional[str] = None
+
+
+def apresenta_event_resumo(event, total_cometarios: Optional[int] = None,
+                           campos: Optional[List[str]] = None):
+    """
+    Retorna a representação de um event usada nas listagens (sem comentários).
+    Aceita tanto uma instância de Event quanto uma linha com as mesmas colunas.
+    O total de comentários só é incluído quando informado (já contado na consulta).
+    Com "campos" apenas esses campos são retornados.
+    """
+    if campos is not None:
+        resumo = {campo: getattr(event, campo) for campo in campos}
+        if total_cometarios is not None:
+            resumo["total_cometarios"] = total_cometarios
+        return resumo
+    resumo = {
+        "id": event.id,
+        "name": event.name,
+        "description": event.description,
+        "observation": event.observation,
+        "date": event.date,
+        "doctor_name": event.doctor_name,
+        "location_name": event.location_name,
+        "location_id": event.location_id,
+        "doctor_id": event.doctor_id,
+        "user_id": event.user_id,
+        "type": event.type,
+        "duration_minutes": event.duration_minutes,
+    }
+    if total_cometarios is not None:
+        resumo["total_cometarios"] = total_cometarios
+    return resumo
 
 
-def apresenta_events(events: List[Event]):
+def apresenta_events(events: List[Event], next_cursor: Optional[str] = None,
+                     totais_comentarios: Optional[List[int]] = None, campos: Optional[List[str]] = None):
     """
     Retorna uma representação dos events seguindo o schema definido,
-    incluindo o campo "id" de cada evento.
-    """
-    result = []
-    for event in events:
-        result.append({
-            "id": event.id,
-            "name": event.name,
-            "description": event.description,
-            "observation": event.observation,
-            "date": event.date,
-            "doctor_name": event.doctor_name,
-            "location_name": event.location_name,
-            "location_id": event.location_id,
-            "doctor_id": event.doctor_id,
-            "user_id": event.user_id,
-            "type": event.type,
-        })
-    return {"events": result}
+    incluindo o campo "id" de cada evento e o cursor da próxima página.
+    Se "totais_comentarios" for informado, cada event recebe seu "total_cometarios".
+    """
+    if totais_comentarios is None:
+        result = [apresenta_event_resumo(event, campos=campos) for event in events]
+    else:
+        result = [apresenta_event_resumo(event, total, campos)
+                  for event, total in zip(events, totais_comentarios)]
+    return {"events": result, "next_cursor": next_cursor}
+
+
+def apresenta_linhas(linhas, next_cursor: Optional[str] = None, campos: Optional[List[str]] = None):
+    """
+    Retorna a mesma representação de apresenta_events a partir das linhas (Row) de uma
+    consulta por colunas, cujos nomes já são as chaves da resposta. Cada linha vira um
+    dict diretamente, sem passar por uma instância de Event.
+    """
+    if not linhas:
+        result = []
+    elif campos is None:
+        # as chaves são lidas uma vez: Row._asdict() refaz essa busca a cada linha
+        chaves = linhas[0]._fields
+        result = [dict(zip(chaves, linha)) for linha in linhas]
+    else:
+        if linhas and "total_cometarios" in linhas[0]._fields:
+            campos = [*campos, "total_cometarios"]
+        result = [{campo: getattr(linha, campo) for campo in campos} for linha in linhas]
+    return {"events": result, "next_cursor": next_cursor}
 
 
 class EventViewSchema(BaseModel):
@@ -79,6 +316,7 @@ class EventViewSchema(BaseModel):
     doctor_id: int = 1
     user_id: str = "default_user_id"
     type: EventType = EventType.CONSULTATION
+    duration_minutes: Optional[int] = 30
     total_cometarios: int = 1
     comentarios: List[ComentarioSchema]
 
@@ -91,10 +329,17 @@ class EventDelSchema(BaseModel):
     name: str
 
 
-def apresenta_event(event: Event):
+def apresenta_event(event: Event, comentarios: Optional[list] = None, campos: Optional[List[str]] = None):
     """
     Retorna uma representação detalhada do event, seguindo o schema EventViewSchema.
+    Os comentários podem ser informados já carregados; caso contrário são lidos
+    de event.comentarios (carregue-os junto com o event para evitar uma consulta extra).
+    Com "campos" apenas esses campos são retornados, sem os comentários.
     """
+    if campos is not None:
+        return {campo: getattr(event, campo) for campo in campos}
+    if comentarios is None:
+        comentarios = event.comentarios
     return {
         "id": event.id,
         "name": event.name,
@@ -107,6 +352,7 @@ def apresenta_event(event: Event):
         "doctor_id": event.doctor_id,
         "user_id": event.user_id,
         "type": event.type,
-        "total_cometarios": len(event.comentarios),
-        "comentarios": [{"texto": c.texto} for c in event.comentarios]
+        "duration_minutes": event.duration_minutes,
+        "total_cometarios": len(comentarios),
+        "comentarios": [{"texto": c.texto} for c in comentarios]
     }
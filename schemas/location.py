@@ -86,10 +86,13 @@ class LocationDelSchema(BaseModel):
     message: str
     name: str
 
-def apresenta_location(location: Location):
+def apresenta_location(location: Location, comentarios: Optional[list] = None):
     """ Retorna uma representação do location seguindo o schema definido em
-        LocationViewSchema.
+        LocationViewSchema. Os comentários podem ser informados já carregados;
+        caso contrário são lidos de location.comentarios.
     """
+    if comentarios is None:
+        comentarios = location.comentarios
     return {
         "id": location.id,
         "name": location.name,
@@ -104,6 +107,6 @@ def apresenta_location(location: Location):
         "phone": location.phone,
         "phone_b": location.phone_b,
         "observation": location.observation,
-        "total_cometarios": len(location.comentarios),
-        "comentarios": [{"texto": c.texto} for c in location.comentarios]
+        "total_cometarios": len(comentarios),
+        "comentarios": [{"texto": c.texto} for c in comentarios]
     }
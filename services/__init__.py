@@ -1 +1,2 @@
 from services.event import EventService
+from services.availability import AvailabilityService
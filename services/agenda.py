@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, select
+import os
+import zlib
+
+from model import Event
+from model.event import DURACAO_MAXIMA_MINUTOS
+
+# Por padrão só a agenda do doctor é exclusiva: um location costuma ser uma clínica
+# que atende vários pacientes ao mesmo tempo. Habilite quando locations forem salas.
+VERIFICA_CONFLITO_LOCATION = os.getenv("AGENDA_CONFLITO_LOCATION", "false").lower() == "true"
+
+
+def fim_do_event(inicio: datetime, duracao_minutos) -> datetime:
+    """
+    Retorna o fim do intervalo ocupado pelo event. Events sem duração ocupam
+    apenas o instante de início.
+    """
+    return inicio + timedelta(minutes=duracao_minutos or 0)
+
+
+def sobrepoe(inicio_a, fim_a, inicio_b, fim_b) -> bool:
+    """
+    Indica se os intervalos [inicio_a, fim_a) e [inicio_b, fim_b) se sobrepõem.
+    Um intervalo vazio (instante) sobrepõe se estiver dentro do outro.
+    """
+    if inicio_a == fim_a:
+        return inicio_b <= inicio_a < fim_b
+    if inicio_b == fim_b:
+        return inicio_a <= inicio_b < fim_a
+    return inicio_a < fim_b and inicio_b < fim_a
+
+
+def mescla_intervalos(intervalos) -> list:
+    """
+    Recebe intervalos (inicio, fim) ordenados pelo início e junta os que se sobrepõem,
+    retornando uma lista ordenada e sem sobreposição. Instantes (inicio == fim) que
+    coincidem com o fim de um intervalo são mantidos separados, pois ocupam esse instante.
+    """
+    mesclados = []
+    for inicio, fim in intervalos:
+        if mesclados and inicio < mesclados[-1][1]:
+            mesclados[-1][1] = max(mesclados[-1][1], fim)
+        else:
+            mesclados.append([inicio, fim])
+    return [(inicio, fim) for inicio, fim in mesclados]
+
+
+def janelas_de_expediente(inicio: datetime, fim: datetime, hora_inicio, hora_fim, dias_semana) -> list:
+    """
+    Retorna, em ordem, os intervalos de expediente entre 'inicio' e 'fim'
+    nos dias da semana informados (0 = segunda-feira).
+    """
+    janelas = []
+    dia = inicio.date()
+    while dia <= fim.date():
+        if dia.weekday() in dias_semana:
+            janela_inicio = max(inicio, datetime.combine(dia, hora_inicio))
+            janela_fim = min(fim, datetime.combine(dia, hora_fim))
+            if janela_inicio < janela_fim:
+                janelas.append((janela_inicio, janela_fim))
+        dia += timedelta(days=1)
+    return janelas
+
+
+def horarios_livres(ocupados, janelas, duracao_slot: timedelta, limite: int = None) -> list:
+    """
+    Percorre em uma única varredura as janelas de expediente e os intervalos ocupados
+    (ambos ordenados, ocupados já mesclados) e retorna o início de cada horário de
+    'duracao_slot' livre. Os horários seguem a grade a partir do início de cada janela.
+    """
+    livres = []
+    i = 0
+    for janela_inicio, janela_fim in janelas:
+        slot_inicio = janela_inicio
+        while slot_inicio + duracao_slot <= janela_fim:
+            slot_fim = slot_inicio + duracao_slot
+            # avança sobre os intervalos que terminam antes do horário; nunca voltam a interessar
+            while i < len(ocupados) and (ocupados[i][1] < slot_inicio or ocupados[i][0] < ocupados[i][1] == slot_inicio):
+                i += 1
+            j = i
+            livre = True
+            while j < len(ocupados) and ocupados[j][0] < slot_fim:
+                if sobrepoe(slot_inicio, slot_fim, *ocupados[j]):
+                    livre = False
+                    break
+                j += 1
+            if livre:
+                livres.append(slot_inicio)
+                if limite and len(livres) >= limite:
+                    return livres
+            slot_inicio = slot_fim
+    return livres
+
+
+def mesma_agenda(doctor_a, location_a, doctor_b, location_b) -> bool:
+    """
+    Indica se dois events disputam a mesma agenda (mesmo doctor ou, quando
+    VERIFICA_CONFLITO_LOCATION, mesmo location).
+    """
+    if doctor_a is not None and doctor_a == doctor_b:
+        return True
+    return VERIFICA_CONFLITO_LOCATION and location_a is not None and location_a == location_b
+
+
+def reserva_escrita(session):
+    """
+    No sqlite inicia a transação da session com BEGIN IMMEDIATE, reservando o lock de
+    escrita antes da verificação de conflitos. Assim dois escritores concorrentes não
+    verificam a mesma agenda ao mesmo tempo. Deve ser chamada antes de qualquer
+    comando na session.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        session.connection(execution_options={"sqlite_begin_immediate": True})
+
+
+def trava_agenda(session, doctor_id, location_id):
+    """
+    No postgres obtém locks consultivos (liberados no fim da transação) para a agenda
+    do doctor e do location, serializando as verificações de conflito sobre eles.
+    No sqlite o lock já foi obtido por reserva_escrita.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    chaves = sorted({
+        zlib.crc32(f"{tipo}:{valor}".encode())
+        for tipo, valor in (("doctor", doctor_id), ("location", location_id))
+        if valor is not None
+    })
+    for chave in chaves:
+        session.execute(select(func.pg_advisory_xact_lock(chave)))
+
+
+def busca_conflitos(session, inicio: datetime, duracao_minutos, doctor_id=None, location_id=None,
+                    ignorar_id=None) -> list:
+    """
+    Retorna os ids dos events do doctor (e do location, se VERIFICA_CONFLITO_LOCATION)
+    que ocupam parte do intervalo [inicio, inicio + duracao_minutos). A verificação só
+    ocorre quando o novo event tem duração.
+
+    Executa uma única consulta com faixa em (doctor_id, date) e (location_id, date),
+    atendida pelos índices ix_event_doctor_date e ix_event_location_date.
+    """
+    if not VERIFICA_CONFLITO_LOCATION:
+        location_id = None
+    if not duracao_minutos or (doctor_id is None and location_id is None):
+        return []
+    trava_agenda(session, doctor_id, location_id)
+
+    fim = fim_do_event(inicio, duracao_minutos)
+    agendas = []
+    if doctor_id is not None:
+        agendas.append(Event.doctor_id == doctor_id)
+    if location_id is not None:
+        agendas.append(Event.location_id == location_id)
+    consulta = (
+        select(Event.id, Event.date, Event.duration_minutes)
+        .where(
+            or_(*agendas),
+            Event.date > inicio - timedelta(minutes=DURACAO_MAXIMA_MINUTOS),
+            Event.date < fim,
+        )
+    )
+    if ignorar_id is not None:
+        consulta = consulta.where(Event.id != ignorar_id)
+
+    return [
+        event_id for event_id, data, duracao in session.execute(consulta)
+        if sobrepoe(inicio, fim, data, fim_do_event(data, duracao))
+    ]
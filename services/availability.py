@@ -0,0 +1,70 @@
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import or_, select
+
+from model import Session, Event
+from model.event import DURACAO_MAXIMA_MINUTOS
+from schemas.availability import AvailabilityBuscaSchema, JANELA_MAXIMA_DIAS, apresenta_availability
+from services.agenda import fim_do_event, horarios_livres, janelas_de_expediente, mescla_intervalos
+from logger import logger
+
+
+#AvailabilityService
+# Responsible for finding free slots in the calendars of doctors and locations, based on the
+# events already booked and on the working hours informed in the query.
+class AvailabilityService:
+    #GET
+    def get_availability(query: AvailabilityBuscaSchema):
+        """
+        Busca os horários livres de todas as agendas informadas com uma única consulta
+        (faixa em (doctor_id, date) / (location_id, date)) e uma varredura ordenada por agenda.
+        """
+        inicio = query.from_.replace(tzinfo=None)
+        fim = query.to.replace(tzinfo=None)
+        if not query.doctor_id and not query.location_id:
+            return {"status": "error", "msg": "Informe ao menos um doctor_id ou location_id", "data": {}}, 400
+        if fim <= inicio or fim - inicio > timedelta(days=JANELA_MAXIMA_DIAS):
+            error_msg = f"Intervalo inválido: 'to' deve ser posterior a 'from' em até {JANELA_MAXIMA_DIAS} dias"
+            return {"status": "error", "msg": error_msg, "data": {}}, 400
+        if query.work_end <= query.work_start:
+            return {"status": "error", "msg": "work_end deve ser posterior a work_start", "data": {}}, 400
+
+        doctors = list(dict.fromkeys(query.doctor_id))
+        locations = list(dict.fromkeys(query.location_id))
+        agendas = []
+        if doctors:
+            agendas.append(Event.doctor_id.in_(doctors))
+        if locations:
+            agendas.append(Event.location_id.in_(locations))
+        consulta = (
+            select(Event.doctor_id, Event.location_id, Event.date, Event.duration_minutes)
+            .where(
+                or_(*agendas),
+                Event.date > inicio - timedelta(minutes=DURACAO_MAXIMA_MINUTOS),
+                Event.date < fim,
+            )
+            .order_by(Event.date)
+        )
+        logger.debug(f"Buscando horários livres de {len(doctors)} doctors e {len(locations)} locations")
+
+        session = Session()
+        try:
+            ocupados = defaultdict(list)
+            for doctor_id, location_id, data, duracao in session.execute(consulta):
+                intervalo = (data, fim_do_event(data, duracao))
+                if doctor_id in doctors:
+                    ocupados[("doctor", doctor_id)].append(intervalo)
+                if location_id in locations:
+                    ocupados[("location", location_id)].append(intervalo)
+        finally:
+            session.close()
+
+        janelas = janelas_de_expediente(inicio, fim, query.work_start, query.work_end, set(query.work_days))
+        duracao_slot = timedelta(minutes=query.slot_minutes)
+        limite = 1 if query.first_only else None
+        resultado = []
+        for tipo, ids in (("doctor", doctors), ("location", locations)):
+            for agenda_id in ids:
+                livres = horarios_livres(mescla_intervalos(ocupados[(tipo, agenda_id)]), janelas, duracao_slot, limite)
+                resultado.append((tipo, agenda_id, livres))
+        return {"status": "ok", "msg": "Horários livres encontrados.", "data": apresenta_availability(query.slot_minutes, resultado)}, 200
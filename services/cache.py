@@ -0,0 +1,174 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import os
+import threading
+import time
+
+from logger import logger
+
+
+class CacheBackend(ABC):
+    """
+    Interface dos caches de listagem usados pelo EventService.
+
+    As entradas são agrupadas por user_id para que uma escrita invalide apenas as
+    listagens do usuário afetado. Para um deploy com vários processos basta
+    implementar esta interface sobre um armazenamento compartilhado (ex.: Redis)
+    e registrá-lo com configura_listagem_cache.
+    """
+
+    @abstractmethod
+    def get(self, user_id, chave):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, user_id, chave, valor):
+        raise NotImplementedError
+
+    @abstractmethod
+    def invalida_usuario(self, user_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def limpa(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    """
+    Cache desabilitado: nunca armazena nada, apenas contabiliza as buscas.
+    """
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, user_id, chave):
+        self.misses += 1
+        return None
+
+    def set(self, user_id, chave, valor):
+        pass
+
+    def invalida_usuario(self, user_id):
+        pass
+
+    def limpa(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "null", "size": 0, "maxsize": 0, "ttl": 0,
+                "hits": 0, "misses": self.misses, "evictions": 0, "invalidations": 0}
+
+
+class LRUCache(CacheBackend):
+    """
+    Cache em memória do processo, com descarte LRU ao atingir 'maxsize' entradas
+    e expiração após 'ttl' segundos.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._chaves_por_usuario = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, chave_completa):
+        self._itens.pop(chave_completa, None)
+        chaves = self._chaves_por_usuario.get(chave_completa[0])
+        if chaves is not None:
+            chaves.discard(chave_completa)
+            if not chaves:
+                del self._chaves_por_usuario[chave_completa[0]]
+
+    def get(self, user_id, chave):
+        chave_completa = (user_id, chave)
+        with self._lock:
+            item = self._itens.get(chave_completa)
+            if item is None:
+                self.misses += 1
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                self._remove(chave_completa)
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave_completa)
+            self.hits += 1
+            return valor
+
+    def set(self, user_id, chave, valor):
+        chave_completa = (user_id, chave)
+        with self._lock:
+            self._itens[chave_completa] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave_completa)
+            self._chaves_por_usuario.setdefault(user_id, set()).add(chave_completa)
+            while len(self._itens) > self.maxsize:
+                mais_antiga = next(iter(self._itens))
+                self._remove(mais_antiga)
+                self.evictions += 1
+
+    def invalida_usuario(self, user_id):
+        with self._lock:
+            for chave_completa in list(self._chaves_por_usuario.get(user_id, ())):
+                self._remove(chave_completa)
+                self.invalidations += 1
+
+    def limpa(self):
+        with self._lock:
+            self._itens.clear()
+            self._chaves_por_usuario.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "lru", "size": len(self._itens), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations}
+
+
+def cria_cache_padrao(maxsize: int = None) -> CacheBackend:
+    """
+    Cria o cache de listagens a partir das variáveis de ambiente
+    LISTAGEM_CACHE_MAXSIZE (0 desabilita) e LISTAGEM_CACHE_TTL (segundos).
+    'maxsize' substitui o LISTAGEM_CACHE_MAXSIZE.
+    """
+    if maxsize is None:
+        maxsize = int(os.getenv("LISTAGEM_CACHE_MAXSIZE", "1024"))
+    ttl = float(os.getenv("LISTAGEM_CACHE_TTL", "30"))
+    if maxsize <= 0:
+        return NullCache()
+    return LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+# cache das listagens de events, já serializadas, agrupadas por user_id
+listagem_cache = cria_cache_padrao()
+
+
+# corpos de respostas com ETag já comprimidos (services.compression), por user_id
+comprimidas_cache = cria_cache_padrao(int(os.getenv("COMPRESSION_CACHE_MAXSIZE", "256")))
+
+
+def configura_listagem_cache(backend: CacheBackend):
+    """
+    Substitui o backend do cache de listagens (ex.: por um cache compartilhado).
+    """
+    global listagem_cache
+    logger.info(f"Cache de listagens configurado: {type(backend).__name__}")
+    listagem_cache = backend
+
+
+def invalida_listagens(*user_ids):
+    """
+    Invalida as listagens dos usuários informados.
+    """
+    for user_id in set(user_ids):
+        listagem_cache.invalida_usuario(user_id)
+        comprimidas_cache.invalida_usuario(user_id)
@@ -0,0 +1,140 @@
+import gzip
+import os
+import re
+
+from flask import request
+from werkzeug.http import parse_etags
+
+from services import cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# respostas menores que isso (em bytes) não compensam a compressão
+TAMANHO_MINIMO = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# arquivos estáticos maiores que isso são enviados sem compressão, em streaming
+TAMANHO_MAXIMO_ARQUIVO = int(os.getenv("COMPRESSION_MAX_FILE_SIZE", str(8 * 1024 * 1024)))
+NIVEL_GZIP = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+NIVEL_BROTLI = int(os.getenv("COMPRESSION_BROTLI_LEVEL", "5"))
+NIVEL_ZSTD = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+MIMETYPES_COMPRESSIVEIS = {
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml",
+}
+
+
+def _compressores() -> dict:
+    """
+    Codificações suportadas, na ordem de preferência do servidor em caso de empate
+    na qualidade informada pelo cliente.
+    """
+    compressores = {}
+    if zstandard is not None:
+        compressores["zstd"] = lambda dados: zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(dados)
+    if brotli is not None:
+        compressores["br"] = lambda dados: brotli.compress(dados, quality=NIVEL_BROTLI)
+    compressores["gzip"] = lambda dados: gzip.compress(dados, compresslevel=NIVEL_GZIP, mtime=0)
+    return compressores
+
+
+COMPRESSORES = _compressores()
+
+
+def escolhe_codificacao(accept_encodings):
+    """
+    Retorna a codificação suportada de maior qualidade no Accept-Encoding do cliente
+    (werkzeug Accept), ou None se nenhuma for aceita.
+    """
+    melhor, melhor_qualidade = None, 0
+    for codificacao in COMPRESSORES:
+        qualidade = accept_encodings[codificacao]
+        if qualidade > melhor_qualidade:
+            melhor, melhor_qualidade = codificacao, qualidade
+    return melhor
+
+
+# sufixo "-<codificação>" que distingue o ETag de cada versão comprimida do corpo
+_SUFIXO_ETAG = re.compile(r'-(?:%s)"' % "|".join(re.escape(c) for c in COMPRESSORES))
+
+
+def normaliza_if_none_match():
+    """
+    before_request do app: acrescenta ao If-None-Match os ETags recebidos sem o sufixo
+    da codificação, para que as rotas (e o send_file) comparem com o ETag do corpo sem
+    compressão. O cabeçalho original fica em environ para o comprime_resposta.
+    """
+    valor = request.environ.get("HTTP_IF_NONE_MATCH")
+    if not valor or not _SUFIXO_ETAG.search(valor):
+        return
+    request.environ["compression.if_none_match"] = valor
+    request.environ["HTTP_IF_NONE_MATCH"] = "%s, %s" % (valor, _SUFIXO_ETAG.sub('"', valor))
+
+
+def _etag_da_codificacao(response, codificacao):
+    # cada codificação tem bytes diferentes, então recebe um ETag próprio
+    etag, fraca = response.get_etag()
+    if etag:
+        response.set_etag("%s-%s" % (etag, codificacao), weak=fraca)
+
+
+def _compressivel(response) -> bool:
+    if response.status_code != 200 or "Content-Encoding" in response.headers:
+        return False
+    if response.mimetype not in MIMETYPES_COMPRESSIVEIS and not response.mimetype.startswith("text/"):
+        return False
+    if response.direct_passthrough:
+        # arquivos (ex.: assets do Swagger) têm tamanho conhecido e podem ser lidos
+        tamanho = response.content_length
+        return tamanho is not None and TAMANHO_MINIMO <= tamanho <= TAMANHO_MAXIMO_ARQUIVO
+    # respostas em streaming (ex.: exportação NDJSON) seguem sem compressão
+    return not response.is_streamed
+
+
+def comprime_resposta(response):
+    """
+    after_request do app: comprime o corpo da resposta com a codificação negociada
+    pelo Accept-Encoding. Respostas com ETag têm os bytes comprimidos guardados em
+    cache.comprimidas_cache, agrupados pelo user_id da listagem, e o ETag ganha o
+    sufixo da codificação (ex.: "<etag>-gzip").
+    """
+    response.vary.add("Accept-Encoding")
+    if response.status_code == 304:
+        # o 304 repete o ETag que o cliente tem, o da versão comprimida se for o caso
+        recebidos = request.environ.get("compression.if_none_match")
+        etag, _ = response.get_etag()
+        codificacao = escolhe_codificacao(request.accept_encodings)
+        if recebidos and etag and codificacao and parse_etags(recebidos).contains_weak("%s-%s" % (etag, codificacao)):
+            _etag_da_codificacao(response, codificacao)
+        return response
+    if not _compressivel(response):
+        return response
+    codificacao = escolhe_codificacao(request.accept_encodings)
+    if codificacao is None:
+        return response
+
+    response.direct_passthrough = False
+    etag, _ = response.get_etag()
+    user_id = request.args.get("user_id")
+    chave = (etag, codificacao)
+    comprimido = cache.comprimidas_cache.get(user_id, chave) if etag else None
+    if comprimido is None:
+        dados = response.get_data()
+        if len(dados) < TAMANHO_MINIMO:
+            return response
+        comprimido = COMPRESSORES[codificacao](dados)
+        if etag:
+            cache.comprimidas_cache.set(user_id, chave, comprimido)
+
+    response.set_data(comprimido)
+    response.headers["Content-Encoding"] = codificacao
+    _etag_da_codificacao(response, codificacao)
+    return response
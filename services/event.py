@@ -1,20 +1,358 @@
+from sqlalchemy import and_, column, delete, func, insert, literal_column, or_, select, table, tuple_, update
+from sqlalchemy.orm import joinedload, load_only
 from sqlalchemy.exc import IntegrityError
 from urllib.parse import unquote
+import base64
+import hashlib
+import json
+import re
 import uuid
 import pudb
 from datetime import datetime
 from model import Session, Event, Comentario
+from model.event import EventType
+from model.fts import COLUNAS_FTS, COLUNAS_TEXTO, TABELA_FTS, fts_suportado, token_usuario
+from services import cache, metrics
+from services.agenda import busca_conflitos, fim_do_event, mesma_agenda, reserva_escrita, sobrepoe
+from services.version import incrementa_versao, obtem_versao
 from schemas.event import (
     EventSchema,
+    EventBatchSchema,
+    EventBulkDelSchema,
+    EventBulkUpdateSchema,
     EventBuscaSchema,
+    EventDetalheBuscaSchema,
+    EventListagemBuscaSchema,
+    EventProximosBuscaSchema,
+    EventExportBuscaSchema,
+    EventCalendarioBuscaSchema,
+    EventPesquisaBuscaSchema,
     EventViewSchema,
+    Granularidade,
     ListagemEventsSchema,
     EventDelSchema,
-    apresenta_events,
-    apresenta_event
+    apresenta_linhas,
+    apresenta_event,
+    apresenta_event_resumo
 )
 from logger import logger
-from flask import request
+from flask import Response, request, stream_with_context
+
+# Quantidade de linhas buscadas do banco por vez durante a exportação
+LOTE_EXPORTACAO = 500
+
+# Colunas lidas nas listagens, na mesma ordem do apresenta_event_resumo
+COLUNAS_LISTAGEM = (
+    Event.id, Event.name, Event.description, Event.observation, Event.date,
+    Event.doctor_name, Event.location_name, Event.location_id, Event.doctor_id,
+    Event.user_id, Event.type, Event.duration_minutes,
+)
+
+# campos que mudam a posição de um event na agenda
+CAMPOS_AGENDA = ("date", "duration_minutes", "doctor_id", "location_id")
+
+
+def _executa_em_lote(session, comando, ids, user_id):
+    """
+    Executa um UPDATE/DELETE restrito aos ids do usuário e retorna os ids afetados.
+    Usa RETURNING quando o dialeto suporta (uma única ida ao banco); caso contrário
+    seleciona os ids afetados antes, na mesma transação.
+    """
+    filtro = (Event.user_id == user_id, Event.id.in_(ids))
+    comando = comando.where(*filtro).execution_options(synchronize_session=False)
+    dialeto = session.get_bind().dialect
+    suporta_returning = dialeto.delete_returning if comando.is_delete else dialeto.update_returning
+    if suporta_returning:
+        return [event_id for (event_id,) in session.execute(comando.returning(Event.id))]
+    afetados = [event_id for (event_id,) in session.query(Event.id).filter(*filtro)]
+    session.execute(comando)
+    return afetados
+
+
+def sem_fuso(valor):
+    """
+    Remove o fuso horário de uma data recebida na query. As datas dos events são
+    gravadas sem fuso, então a comparação é feita com o horário como informado.
+    """
+    if valor is not None and valor.tzinfo is not None:
+        return valor.replace(tzinfo=None)
+    return valor
+
+
+def resposta_conflito(conflitos: list):
+    error_msg = "Conflito de agenda: o horário já está ocupado por outro event"
+    return {"status": "error", "msg": error_msg, "data": {"conflicts": conflitos}}, 409
+
+
+def conflitos_em_lote(session, ids, user_id, valores) -> list:
+    """
+    Retorna os ids que conflitam com a nova posição na agenda dos events do usuário
+    informados em 'ids', depois de aplicar 'valores': events já gravados fora do lote
+    e os próprios events do lote entre si. Deve ser chamada após reserva_escrita.
+    """
+    atuais = session.execute(
+        select(Event.id, Event.date, Event.duration_minutes, Event.doctor_id, Event.location_id)
+        .where(Event.user_id == user_id, Event.id.in_(ids))
+        .order_by(Event.date, Event.id)
+    ).all()
+    alvo = {linha.id for linha in atuais}
+    conflitos = []
+    aceitos = []
+    for linha in atuais:
+        novo = dict(linha._asdict(), **{campo: valores[campo] for campo in CAMPOS_AGENDA if campo in valores})
+        inicio = sem_fuso(novo["date"])
+        if inicio is None:
+            continue
+        fim = fim_do_event(inicio, novo["duration_minutes"])
+        # as posições antigas dos events do lote deixam de existir
+        conflitos += [
+            event_id for event_id in busca_conflitos(session, inicio, novo["duration_minutes"],
+                                                     novo["doctor_id"], novo["location_id"])
+            if event_id not in alvo
+        ]
+        if novo["duration_minutes"]:
+            conflitos += [
+                outro["id"] for outro, outro_inicio, outro_fim in aceitos
+                if mesma_agenda(novo["doctor_id"], novo["location_id"], outro["doctor_id"], outro["location_id"])
+                and sobrepoe(inicio, fim, outro_inicio, outro_fim)
+            ]
+        aceitos.append((novo, inicio, fim))
+    return list(dict.fromkeys(conflitos))
+
+
+def descarta_conflitos_do_lote(session, linhas: dict, resultados: list):
+    """
+    Remove de 'linhas' (index -> valores do event) os itens de um lote de inclusão que
+    conflitam com events já gravados ou com os itens anteriores do lote, registrando
+    o 409 de cada um em 'resultados'. Deve ser chamada após reserva_escrita.
+    """
+    aceitos = []
+    for index, linha in list(linhas.items()):
+        inicio = sem_fuso(linha["date"])
+        fim = fim_do_event(inicio, linha["duration_minutes"])
+        conflitos = busca_conflitos(session, inicio, linha["duration_minutes"],
+                                    linha["doctor_id"], linha["location_id"])
+        if linha["duration_minutes"]:
+            conflitos += [
+                outro["id"] for outro, outro_inicio, outro_fim in aceitos
+                if mesma_agenda(linha["doctor_id"], linha["location_id"], outro["doctor_id"], outro["location_id"])
+                and sobrepoe(inicio, fim, outro_inicio, outro_fim)
+            ]
+        if conflitos:
+            del linhas[index]
+            resultados[index] = {"index": index, "status": 409, "msg": "Conflito de agenda: o horário já está ocupado por outro event",
+                                 "data": {"conflicts": conflitos}}
+        else:
+            aceitos.append((linha, inicio, fim))
+
+
+def gera_etag(user_id, versao, *parametros) -> str:
+    """
+    Gera o ETag de uma listagem a partir da versão dos events do usuário e dos
+    parâmetros da consulta. Muda sempre que o usuário tem uma nova escrita.
+    """
+    chave = json.dumps([user_id, versao, *parametros], default=str)
+    return hashlib.sha1(chave.encode()).hexdigest()[:24]
+
+
+def cabecalhos_etag(etag: str) -> dict:
+    # no-cache: o cliente pode guardar a resposta, mas deve revalidar com If-None-Match
+    return {"ETag": f'W/"{etag}"', "Cache-Control": "no-cache"}
+
+
+def total_comentarios_subquery():
+    """
+    Subconsulta correlacionada que conta os comentários de cada event, resolvida
+    pelo índice de comentario.event na mesma consulta da listagem.
+    """
+    return (
+        select(func.count(Comentario.id))
+        .where(Comentario.event == Event.id)
+        .correlate(Event)
+        .scalar_subquery()
+    )
+
+
+def periodo_expressao(dialeto: str, granularidade: Granularidade):
+    """
+    Expressão SQL com a data de início (YYYY-MM-DD) do período de cada event:
+    o próprio dia, a segunda-feira da semana ou o primeiro dia do mês.
+    """
+    if dialeto == "sqlite":
+        if granularidade == Granularidade.WEEK:
+            # 'weekday 0' avança até o domingo; voltando 6 dias chega à segunda-feira
+            return func.date(Event.date, 'weekday 0', '-6 days')
+        formato = '%Y-%m-01' if granularidade == Granularidade.MONTH else '%Y-%m-%d'
+        return func.strftime(formato, Event.date)
+    if dialeto == "postgresql":
+        return func.to_char(func.date_trunc(granularidade.value, Event.date), 'YYYY-MM-DD')
+    raise ValueError(f"Agregação por período não suportada para o banco '{dialeto}'")
+
+
+def _serializa_valor(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def codifica_cursor(event) -> str:
+    """
+    Gera o cursor opaco que aponta para a posição logo após o event (ou linha com
+    as colunas date e id) informado, seguindo a ordenação (date, id) da listagem.
+    """
+    chave = json.dumps([event.date.isoformat(), event.id])
+    return base64.urlsafe_b64encode(chave.encode()).decode()
+
+
+def decodifica_cursor(cursor: str):
+    """
+    Retorna a tupla (date, id) contida no cursor.
+    Lança ValueError caso o cursor não tenha sido gerado por codifica_cursor.
+    """
+    try:
+        date, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(date), str(event_id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+# peso de cada coluna no bm25: uma palavra no name vale mais que na description ou
+# na observation
+PESOS_PESQUISA = {"name": 10, "description": 2, "observation": 1, "doctor_name": 4, "location_name": 4}
+_PALAVRAS = re.compile(r"\w+")
+
+
+def expressao_pesquisa(user_id: str, q: str) -> str:
+    """
+    Monta a expressão MATCH do FTS5: o token do user_id na coluna user_id e cada
+    palavra de "q" como prefixo nas colunas de texto. Só as palavras são usadas, então
+    operadores e aspas digitados pelo usuário não chegam à sintaxe do FTS5.
+    Lança ValueError se "q" não tiver nenhuma palavra.
+    """
+    palavras = _PALAVRAS.findall(q)
+    if not palavras:
+        raise ValueError("Informe ao menos uma palavra em 'q'")
+    termos = " AND ".join('"%s"*' % palavra for palavra in palavras)
+    return 'user_id : %s AND {%s} : (%s)' % (token_usuario(user_id), " ".join(COLUNAS_TEXTO), termos)
+
+
+def codifica_cursor_pesquisa(linha) -> str:
+    """Cursor da busca textual: a posição logo após a linha na ordem (score, date desc, id)."""
+    chave = json.dumps([linha.score, linha.date.isoformat(), linha.id])
+    return base64.urlsafe_b64encode(chave.encode()).decode()
+
+
+def decodifica_cursor_pesquisa(cursor: str):
+    try:
+        score, date, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), datetime.fromisoformat(date), str(event_id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+def consulta_pesquisa(query: EventPesquisaBuscaSchema, expressao: str):
+    """
+    Monta o SELECT da busca textual. O FTS5 resolve o MATCH (palavras e user_id) no
+    índice e a tabela event é lida pelo fts_id.
+
+    A relevância ("score") é o bm25 do FTS5 com os pesos de PESOS_PESQUISA por coluna
+    (a coluna user_id tem peso 0); quanto menor, mais relevante. Empates são ordenados
+    do event mais recente para o mais antigo.
+    """
+    fts = table(TABELA_FTS, column("rowid"))
+    tabela_fts = literal_column(TABELA_FTS)
+    pesos = [0 if coluna == "user_id" else PESOS_PESQUISA[coluna] for coluna in COLUNAS_FTS]
+    score = func.bm25(tabela_fts, *(literal_column(str(peso)) for peso in pesos))
+    encontrados = (
+        select(fts.c.rowid.label("fts_id"), score.label("score"))
+        .where(tabela_fts.op("MATCH")(expressao))
+        .subquery()
+    )
+    consulta = (
+        select(*COLUNAS_LISTAGEM, encontrados.c.score)
+        .join_from(encontrados, Event, Event.fts_id == encontrados.c.fts_id)
+        .where(Event.user_id == query.user_id)
+    )
+    if query.cursor:
+        ultimo_score, ultima_data, ultimo_id = decodifica_cursor_pesquisa(query.cursor)
+        consulta = consulta.where(or_(
+            encontrados.c.score > ultimo_score,
+            and_(encontrados.c.score == ultimo_score,
+                 or_(Event.date < ultima_data, and_(Event.date == ultima_data, Event.id > ultimo_id))),
+        ))
+    consulta = consulta.order_by(encontrados.c.score, Event.date.desc(), Event.id)
+    # busca um registro a mais apenas para saber se existe próxima página
+    return consulta.limit(query.limit + 1)
+
+
+def periodo_listagem(query: EventListagemBuscaSchema):
+    """
+    Retorna o intervalo (inicio, fim) da listagem e a tupla de parâmetros usada no
+    ETag e na chave do cache. Lança ValueError se o cursor for inválido.
+    """
+    if query.cursor:
+        decodifica_cursor(query.cursor)
+    inicio, fim = sem_fuso(query.from_), sem_fuso(query.to)
+    if query.upcoming:
+        # truncado ao minuto para que ETag e cache continuem válidos entre polls próximos
+        agora = datetime.now().replace(second=0, microsecond=0)
+        inicio = max(inicio, agora) if inicio else agora
+    campos = tuple(query.fields) if query.fields else None
+    return inicio, fim, (query.limit, query.cursor, query.with_total_comentarios, inicio, fim, campos)
+
+
+def carrega_campos(campos):
+    """
+    Opção de carregamento que lê do banco apenas as colunas dos campos pedidos em
+    "fields" (além de id e date) ao buscar instâncias de Event.
+    """
+    return load_only(*(getattr(Event, campo) for campo in dict.fromkeys(["id", "date", *campos])))
+
+
+def consulta_listagem(query: EventListagemBuscaSchema, inicio, fim):
+    """
+    Monta o SELECT da listagem, usado tanto pela session síncrona quanto pela assíncrona.
+    A listagem é somente leitura: seleciona apenas colunas (COLUNAS_LISTAGEM ou as de
+    "fields"), então as linhas vêm como tuplas, sem instanciar Event nem passar pelo
+    identity map da session.
+    """
+    if query.fields:
+        colunas = [getattr(Event, campo) for campo in dict.fromkeys(["id", "date", *query.fields])]
+    else:
+        colunas = list(COLUNAS_LISTAGEM)
+    if query.with_total_comentarios:
+        colunas.append(total_comentarios_subquery().label("total_cometarios"))
+    consulta = select(*colunas)
+    if query.user_id:
+        consulta = consulta.where(Event.user_id == query.user_id)
+    if inicio:
+        consulta = consulta.where(Event.date >= inicio)
+    if fim:
+        consulta = consulta.where(Event.date < fim)
+    if query.cursor:
+        consulta = consulta.where(tuple_(Event.date, Event.id) > decodifica_cursor(query.cursor))
+    consulta = consulta.order_by(Event.date, Event.id)
+    if query.limit:
+        # busca um registro a mais apenas para saber se existe próxima página
+        consulta = consulta.limit(query.limit + 1)
+    return consulta
+
+
+def apresenta_listagem(query: EventListagemBuscaSchema, linhas):
+    """
+    Converte as linhas retornadas por consulta_listagem na tupla (msg, data) da resposta.
+    """
+    next_cursor = None
+    if query.limit and len(linhas) > query.limit:
+        linhas = linhas[:query.limit]
+        next_cursor = codifica_cursor(linhas[-1])
+    logger.debug(f"{len(linhas)} events encontrados para user_id {query.user_id}")
+
+    if not linhas:
+        msg = "Nenhum event encontrado."
+    else:
+        logger.debug(f"Retornando {len(linhas)} events")
+        msg = "Events coletados com sucesso."
+    return msg, apresenta_linhas(linhas, next_cursor, query.fields)
 
 #EventService
 # Responsible for communicating with the appointments database, GET, POST, PUT and DELETE, all operations use
@@ -34,16 +372,28 @@ class EventService:
             location_name=body.location_name,
             location_id=body.location_id,
             doctor_id=body.doctor_id,
-            user_id=body.user_id
+            user_id=body.user_id,
+            duration_minutes=body.duration_minutes
         )
         logger.debug(f"Adicionando event de name: '{event.name}' com id: '{event.id}'")
-        session = Session()
+        # expire_on_commit=False: o event recém-criado é apresentado com os valores
+        # já em memória, sem um SELECT de recarga após o commit
+        session = Session(expire_on_commit=False)
         try:
             try:
+                reserva_escrita(session)
+                conflitos = busca_conflitos(session, sem_fuso(event.date), event.duration_minutes,
+                                            event.doctor_id, event.location_id)
+                if conflitos:
+                    session.rollback()
+                    logger.warning(f"Conflito de agenda ao adicionar event '{event.name}': {conflitos}")
+                    return resposta_conflito(conflitos)
                 session.add(event)
+                incrementa_versao(session, event.user_id)
                 session.commit()
+                cache.invalida_listagens(event.user_id)
                 logger.debug(f"Adicionado event de name: '{event.name}' com id: '{event.id}'")
-                return {"status": "ok", "msg": "Event adicionado com sucesso.", "data": apresenta_event(event)}, 200
+                return {"status": "ok", "msg": "Event adicionado com sucesso.", "data": apresenta_event(event, comentarios=[])}, 200
             except IntegrityError as e:
                 session.rollback()
                 error_msg = f"Erro de integridade ao adicionar event: {e.orig if hasattr(e, 'orig') else str(e)}"
@@ -60,41 +410,274 @@ class EventService:
         finally:
             session.close()
 
+    #POST (lote)
+    def add_events_batch(body: EventBatchSchema):
+        """
+        Adiciona vários events em uma única transação, com um único commit.
+        Nomes já existentes na base ou repetidos dentro do próprio lote recebem 409
+        individualmente, sem impedir a inserção dos demais itens.
+        """
+        resultados = [None] * len(body.events)
+        linhas = {}
+        nomes_no_lote = set()
+        for index, item in enumerate(body.events):
+            if item.name in nomes_no_lote:
+                resultados[index] = {"index": index, "status": 409, "msg": f"Nome '{item.name}' repetido no lote", "data": {}}
+                continue
+            nomes_no_lote.add(item.name)
+            linhas[index] = {
+                "id": str(uuid.uuid4()),
+                "name": item.name,
+                "description": item.description,
+                "observation": item.observation,
+                "date": item.date,
+                "doctor_name": item.doctor_name,
+                "location_name": item.location_name,
+                "location_id": item.location_id,
+                "doctor_id": item.doctor_id,
+                "user_id": item.user_id or "default_user_id",
+                "type": item.type.value,
+                "duration_minutes": item.duration_minutes,
+            }
+        logger.debug(f"Adicionando lote de {len(body.events)} events")
+
+        session = Session()
+        try:
+            reserva_escrita(session)
+            existentes = {
+                name for (name,) in
+                session.query(Event.name).filter(Event.name.in_(nomes_no_lote)).all()
+            }
+            for index, linha in list(linhas.items()):
+                if linha["name"] in existentes:
+                    del linhas[index]
+                    resultados[index] = {"index": index, "status": 409, "msg": f"Nome '{linha['name']}' já existe na base", "data": {}}
+
+            descarta_conflitos_do_lote(session, linhas, resultados)
+
+            try:
+                if linhas:
+                    session.execute(insert(Event), list(linhas.values()))
+            except IntegrityError:
+                # outra requisição inseriu um dos nomes entre a verificação e o insert:
+                # refaz item a item com savepoints para isolar apenas os conflitantes.
+                # O rollback encerrou a transação e liberou os locks de escrita, então
+                # a agenda pode ter mudado: reserva de novo e verifica os conflitos outra vez
+                session.rollback()
+                reserva_escrita(session)
+                descarta_conflitos_do_lote(session, linhas, resultados)
+                for index, linha in list(linhas.items()):
+                    try:
+                        with session.begin_nested():
+                            session.execute(insert(Event), [linha])
+                    except IntegrityError as e:
+                        del linhas[index]
+                        detail = e.orig if hasattr(e, 'orig') else str(e)
+                        resultados[index] = {"index": index, "status": 409, "msg": f"Erro de integridade ao adicionar event: {detail}", "data": {}}
+            incrementa_versao(session, *{linha["user_id"] for linha in linhas.values()})
+            session.commit()
+            cache.invalida_listagens(*{linha["user_id"] for linha in linhas.values()})
+        except Exception as e:
+            session.rollback()
+            error_msg = "Não foi possível salvar o lote de events :/"
+            logger.warning(f"Erro ao adicionar lote de events: {error_msg} - {e}")
+            return {"status": "error", "msg": error_msg, "data": {}}, 400
+        finally:
+            session.close()
+
+        for index, linha in linhas.items():
+            resultados[index] = {"index": index, "status": 200, "msg": "Event adicionado com sucesso.", "data": linha}
+        falhas = len(resultados) - len(linhas)
+        logger.debug(f"Lote adicionado: {len(linhas)} events criados, {falhas} com erro")
+        data = {"created": len(linhas), "failed": falhas, "results": resultados}
+        return {"status": "ok", "msg": f"{len(linhas)} events adicionados, {falhas} com erro.", "data": data}, 200
+
     #GET
-    def get_events():
+    def get_events(query: EventListagemBuscaSchema):
+        """
+        Lista os events, opcionalmente filtrados por 'user_id'.
+        Quando 'limit' é informado a listagem é paginada por keyset em (date, id): cada
+        página parte do cursor recebido, então o custo não cresce com a profundidade.
+        Os filtros 'from'/'to'/'upcoming' viram um intervalo em Event.date, resolvido
+        pelo índice (user_id, date, pk_event) sem ler events fora do intervalo.
+        """
         logger.debug("Coletando events")
+        try:
+            inicio, fim, parametros = periodo_listagem(query)
+        except ValueError as e:
+            return {"status": "error", "msg": str(e), "data": {}}, 400
+
         session = Session()
         try:
-            user_id = request.args.get("user_id")
-            if user_id:
-                events = session.query(Event).filter(Event.user_id == user_id).all()
-                logger.debug(f"{len(events)} events encontrados para user_id {user_id}")
-            else:
-                events = session.query(Event).all()
-                logger.debug(f"{len(events)} events encontrados (sem filtro)")
-            if not events:
-                return {"status": "ok", "msg": "Nenhum event encontrado.", "data": []}, 200
-            else:
-                logger.debug(f"Retornando {len(events)} events")
-                teste = apresenta_events(events)
-                print(teste)
-                return {"status": "ok", "msg": "Events coletados com sucesso.", "data": apresenta_events(events)}, 200
+            versao = None
+            cabecalhos = {}
+            if query.user_id:
+                # a versão é uma leitura por chave primária: permite responder 304 e
+                # validar o cache sem executar a consulta dos events
+                versao = obtem_versao(session, query.user_id)
+                etag = gera_etag(query.user_id, versao, *parametros)
+                cabecalhos = cabecalhos_etag(etag)
+                if request.if_none_match.contains_weak(etag):
+                    logger.debug(f"Listagem do user_id {query.user_id} não modificada")
+                    return "", 304, cabecalhos
+
+            # só as listagens de um usuário vão para o cache: a versão na chave é gravada no
+            # banco, então uma escrita feita por outro worker também muda a chave. A listagem
+            # sem user_id não tem versão e ficaria desatualizada nos demais workers
+            chave_cache = (versao, *parametros)
+            em_cache = cache.listagem_cache.get(query.user_id, chave_cache) if query.user_id else None
+            if em_cache is not None:
+                msg, data = em_cache
+                logger.debug(f"Listagem do user_id {query.user_id} servida do cache")
+                return {"status": "ok", "msg": msg, "data": data}, 200, cabecalhos
+
+            linhas = session.execute(consulta_listagem(query, inicio, fim)).all()
+            metrics.observa_linhas_listagem(len(linhas))
+            msg, data = apresenta_listagem(query, linhas)
+            if query.user_id:
+                cache.listagem_cache.set(query.user_id, chave_cache, (msg, data))
+            return {"status": "ok", "msg": msg, "data": data}, 200, cabecalhos
+        finally:
+            session.close()
+
+    #GET
+    def get_next_events(query: EventProximosBuscaSchema):
+        """
+        Retorna os próximos 'n' events do usuário, a partir de agora, em ordem de data.
+        """
+        listagem = EventListagemBuscaSchema(user_id=query.user_id, limit=query.n, upcoming=True)
+        return EventService.get_events(listagem)
+
+    #GET
+    def get_calendar(query: EventCalendarioBuscaSchema):
+        """
+        Conta os events do usuário por período (dia, semana ou mês) e por tipo com um
+        único GROUP BY no banco, retornando arrays compactos alinhados a 'buckets'.
+        """
+        user_id = query.user_id
+        inicio, fim = sem_fuso(query.from_), sem_fuso(query.to)
+        logger.debug(f"Agregando events do user_id {user_id} por {query.granularity.value}")
+        session = Session()
+        try:
+            versao = obtem_versao(session, user_id)
+            etag = gera_etag(user_id, versao, "calendar", query.granularity.value, inicio, fim)
+            cabecalhos = cabecalhos_etag(etag)
+            if request.if_none_match.contains_weak(etag):
+                return "", 304, cabecalhos
+
+            try:
+                periodo = periodo_expressao(session.get_bind().dialect.name, query.granularity).label("periodo")
+            except ValueError as e:
+                return {"status": "error", "msg": str(e), "data": {}}, 400
+            consulta = session.query(periodo, Event.type, func.count()).filter(Event.user_id == user_id)
+            if inicio:
+                consulta = consulta.filter(Event.date >= inicio)
+            if fim:
+                consulta = consulta.filter(Event.date < fim)
+            linhas = consulta.group_by(periodo, Event.type).order_by(periodo).all()
         finally:
             session.close()
+
+        buckets = sorted({linha[0] for linha in linhas})
+        posicoes = {bucket: i for i, bucket in enumerate(buckets)}
+        counts = {tipo.name: [0] * len(buckets) for tipo in EventType}
+        total = [0] * len(buckets)
+        for bucket, tipo, quantidade in linhas:
+            nome = EventType(tipo).name if tipo in EventType._value2member_map_ else str(tipo)
+            counts.setdefault(nome, [0] * len(buckets))[posicoes[bucket]] += quantidade
+            total[posicoes[bucket]] += quantidade
+        data = {"granularity": query.granularity.value, "buckets": buckets, "counts": counts, "total": total}
+        return {"status": "ok", "msg": "Calendário gerado com sucesso.", "data": data}, 200, cabecalhos
+
     #GET
-    def get_event(query: EventBuscaSchema):
+    def search_events(query: EventPesquisaBuscaSchema):
+        """
+        Busca textual (sqlite FTS5) nos events do usuário, ordenada por relevância
+        (ver consulta_pesquisa) e paginada por cursor. Responde 304 enquanto os events do usuário
+        não mudarem, como a listagem.
+        """
+        user_id = query.user_id
+        try:
+            expressao = expressao_pesquisa(user_id, query.q)
+            if query.cursor:
+                decodifica_cursor_pesquisa(query.cursor)
+        except ValueError as e:
+            return {"status": "error", "msg": str(e), "data": {}}, 400
+
+        session = Session()
+        try:
+            if not fts_suportado(session.get_bind()):
+                msg = f"Busca textual não suportada para o banco '{session.get_bind().dialect.name}'"
+                return {"status": "error", "msg": msg, "data": {}}, 400
+            versao = obtem_versao(session, user_id)
+            etag = gera_etag(user_id, versao, "search", query.q, query.limit, query.cursor)
+            cabecalhos = cabecalhos_etag(etag)
+            if request.if_none_match.contains_weak(etag):
+                return "", 304, cabecalhos
+            linhas = session.execute(consulta_pesquisa(query, expressao)).all()
+        finally:
+            session.close()
+
+        next_cursor = None
+        if len(linhas) > query.limit:
+            linhas = linhas[:query.limit]
+            next_cursor = codifica_cursor_pesquisa(linhas[-1])
+        logger.debug(f"{len(linhas)} events encontrados na busca do user_id {user_id}")
+        msg = "Events encontrados com sucesso." if linhas else "Nenhum event encontrado."
+        data = apresenta_linhas(linhas, next_cursor, [coluna.key for coluna in COLUNAS_LISTAGEM])
+        return {"status": "ok", "msg": msg, "data": data}, 200, cabecalhos
+
+    #GET (streaming)
+    def export_events(query: EventExportBuscaSchema):
+        """
+        Exporta todos os events do usuário como NDJSON (um event por linha).
+        As linhas são lidas do banco em lotes de LOTE_EXPORTACAO e enviadas conforme
+        são serializadas, então a memória usada não depende do total de events.
+        """
+        user_id = query.user_id
+        logger.debug(f"Exportando events do user_id {user_id}")
+        consulta = (
+            select(*COLUNAS_LISTAGEM)
+            .where(Event.user_id == user_id)
+            .order_by(Event.date, Event.id)
+            .execution_options(yield_per=LOTE_EXPORTACAO)
+        )
+
+        def gera_linhas():
+            session = Session()
+            total = 0
+            try:
+                for row in session.execute(consulta):
+                    total += 1
+                    yield json.dumps(apresenta_event_resumo(row), default=_serializa_valor, ensure_ascii=False) + "\n"
+                logger.debug(f"{total} events exportados para user_id {user_id}")
+            finally:
+                session.close()
+
+        return Response(stream_with_context(gera_linhas()), mimetype="application/x-ndjson")
+
+    #GET
+    def get_event(query: EventDetalheBuscaSchema):
         event_id = query.id
         logger.debug(f"Coletando dados sobre event #{event_id}")
+        # com "fields" só as colunas pedidas são lidas e os comentários não são carregados
+        carregamento = carrega_campos(query.fields) if query.fields else joinedload(Event.comentarios)
         session = Session()
         try:
-            event = session.query(Event).filter(Event.name == event_id).first()
+            event = (
+                session.query(Event)
+                .options(carregamento)
+                .filter(Event.name == event_id)
+                .first()
+            )
             if not event:
                 error_msg = "Event não encontrado na base :/"
                 logger.warning(f"Erro ao buscar event '{event_id}': {error_msg}")
                 return {"status": "error", "msg": error_msg, "data": {}}, 404
             else:
                 logger.debug(f"Event encontrado: '{event.id}'")
-                return {"status": "ok", "msg": "Event encontrado.", "data": apresenta_event(event)}, 200
+                data = apresenta_event(event, campos=query.fields)
+                return {"status": "ok", "msg": "Event encontrado.", "data": data}, 200
         finally:
             session.close()
 
@@ -115,13 +698,20 @@ class EventService:
 
         session = Session()
         try:
-            event = session.query(Event).filter(Event.id == event_id, Event.user_id == user_id).first()
+            event = (
+                session.query(Event)
+                .options(joinedload(Event.comentarios))
+                .filter(Event.id == event_id, Event.user_id == user_id)
+                .first()
+            )
             if not event:
                 return {"status": "error", "msg": "Event não encontrado ou não pertence ao usuário", "data": {}}, 404
 
             event_data = apresenta_event(event)
             count = session.query(Event).filter(Event.id == event_id, Event.user_id == user_id).delete()
+            incrementa_versao(session, user_id)
             session.commit()
+            cache.invalida_listagens(user_id)
             if count:
                 return {"status": "ok", "msg": "Event removido", "data": event_data}, 200
             else:
@@ -132,6 +722,75 @@ class EventService:
         finally:
             session.close()
 
+    #DELETE (lote)
+    def del_events_by_ids_and_user(body: EventBulkDelSchema):
+        """
+        Remove, com um único comando, todos os events informados em 'ids' que pertençam ao 'user_id'.
+        Retorna os ids removidos e os que não foram encontrados para o usuário.
+        """
+        ids = list(dict.fromkeys(body.ids))
+        logger.debug(f"Removendo {len(ids)} events do user_id {body.user_id}")
+        session = Session()
+        try:
+            afetados = _executa_em_lote(session, delete(Event), ids, body.user_id)
+            if afetados:
+                incrementa_versao(session, body.user_id)
+            session.commit()
+            if afetados:
+                cache.invalida_listagens(body.user_id)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+        removidos = set(afetados)
+        data = {"affected": afetados, "not_found": [i for i in ids if i not in removidos]}
+        logger.debug(f"{len(afetados)} events removidos do user_id {body.user_id}")
+        return {"status": "ok", "msg": f"{len(afetados)} events removidos", "data": data}, 200
+
+    #PATCH (lote)
+    def update_events_by_ids_and_user(body: EventBulkUpdateSchema):
+        """
+        Aplica, com um único comando, as alterações de 'changes' a todos os events informados
+        em 'ids' que pertençam ao 'user_id'. Retorna os ids atualizados e os não encontrados.
+        Alterações de agenda que criariam sobreposição recebem 409 e nada é atualizado.
+        """
+        ids = list(dict.fromkeys(body.ids))
+        valores = body.changes.dict(exclude_unset=True)
+        if not valores:
+            return {"status": "error", "msg": "Nenhuma alteração informada em 'changes'", "data": {}}, 400
+        if "type" in valores and hasattr(valores["type"], "value"):
+            valores["type"] = valores["type"].value
+        logger.debug(f"Atualizando {len(ids)} events do user_id {body.user_id}")
+        session = Session()
+        try:
+            try:
+                if any(campo in valores for campo in CAMPOS_AGENDA):
+                    reserva_escrita(session)
+                    conflitos = conflitos_em_lote(session, ids, body.user_id, valores)
+                    if conflitos:
+                        session.rollback()
+                        logger.warning(f"Conflito de agenda ao atualizar events em lote: {conflitos}")
+                        return resposta_conflito(conflitos)
+                afetados = _executa_em_lote(session, update(Event).values(**valores), ids, body.user_id)
+                if afetados:
+                    incrementa_versao(session, body.user_id)
+                session.commit()
+                if afetados:
+                    cache.invalida_listagens(body.user_id)
+            except IntegrityError as e:
+                session.rollback()
+                detail = e.orig if hasattr(e, 'orig') else str(e)
+                error_msg = f"Erro de integridade ao atualizar events: {detail}"
+                logger.warning(f"Erro ao atualizar events em lote: {error_msg}")
+                return {"status": "error", "msg": error_msg, "data": {}}, 409
+        finally:
+            session.close()
+        atualizados = set(afetados)
+        data = {"affected": afetados, "not_found": [i for i in ids if i not in atualizados]}
+        logger.debug(f"{len(afetados)} events atualizados do user_id {body.user_id}")
+        return {"status": "ok", "msg": f"{len(afetados)} events atualizados", "data": data}, 200
+
     #PUT
     def update_event(query: EventBuscaSchema, body: EventSchema):
         """
@@ -141,21 +800,38 @@ class EventService:
         """
         event_id = query.id
         user_id = query.user_id
-        session = Session()
+        # expire_on_commit=False: o event atualizado é apresentado com os valores
+        # já em memória, sem recarregar event e comentários após o commit
+        session = Session(expire_on_commit=False)
         try:
-            event = session.query(Event).filter(Event.id == event_id, Event.user_id == user_id).first()
+            reserva_escrita(session)
+            event = (
+                session.query(Event)
+                .options(joinedload(Event.comentarios))
+                .filter(Event.id == event_id, Event.user_id == user_id)
+                .first()
+            )
             if not event:
                 error_msg = "Event não encontrado ou não pertence ao usuário"
                 logger.warning(f"Erro ao atualizar event '{event_id}': {error_msg}")
                 return {"status": "error", "msg": error_msg, "data": {}}, 404
             try:
+                user_id_anterior = event.user_id
                 payload = body.dict(exclude_unset=True)
                 for key, value in payload.items():
                     if key == "type" and hasattr(value, "value"):
                         value = value.value
                     setattr(event, key, value)
                 event.updated_at = datetime.now()
+                conflitos = busca_conflitos(session, sem_fuso(event.date), event.duration_minutes,
+                                            event.doctor_id, event.location_id, ignorar_id=event.id)
+                if conflitos:
+                    session.rollback()
+                    logger.warning(f"Conflito de agenda ao atualizar event '{event_id}': {conflitos}")
+                    return resposta_conflito(conflitos)
+                incrementa_versao(session, user_id_anterior, event.user_id)
                 session.commit()
+                cache.invalida_listagens(user_id_anterior, event.user_id)
                 logger.debug(f"Event atualizado: '{event.id}'")
                 return {"status": "ok", "msg": "Event atualizado com sucesso.", "data": apresenta_event(event)}, 200
             except IntegrityError as e:
@@ -193,7 +869,10 @@ class EventService:
                 texto = form.texto
                 comentario = Comentario(texto)
                 event.adiciona_comentario(comentario)
+                # o total de comentários faz parte das listagens do dono do event
+                incrementa_versao(session, event.user_id)
                 session.commit()
+                cache.invalida_listagens(event.user_id)
                 logger.debug(f"Adicionado comentário ao event #{event_id}")
                 return {"status": "ok", "msg": "Comentário adicionado com sucesso.", "data": apresenta_event(event)}, 200
             except IntegrityError as e:
@@ -0,0 +1,216 @@
+from sqlalchemy import delete, select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
+import uuid
+from datetime import datetime
+from model import Event
+from model.async_session import SessionAsync
+from services import cache, metrics
+from services.agenda import busca_conflitos, reserva_escrita
+from services.event import (
+    apresenta_listagem,
+    cabecalhos_etag,
+    carrega_campos,
+    consulta_listagem,
+    gera_etag,
+    periodo_listagem,
+    resposta_conflito,
+    sem_fuso,
+)
+from services.version import incrementa_versao, obtem_versao
+from schemas.event import (
+    EventSchema,
+    EventBuscaSchema,
+    EventDetalheBuscaSchema,
+    EventListagemBuscaSchema,
+    EventProximosBuscaSchema,
+    apresenta_event,
+)
+from logger import logger
+
+
+#AsyncEventService
+# Versões assíncronas das operações do EventService usadas pelo modo ASGI (asgi.py).
+# As consultas são as mesmas do modo síncrono; os helpers que recebem uma session
+# síncrona (conflitos, versão) rodam via AsyncSession.run_sync, sem bloquear o loop.
+class AsyncEventService:
+    #POST
+    async def add_event(body: EventSchema):
+        event = Event(
+            id=str(uuid.uuid4()),
+            name=body.name,
+            date=body.date,
+            type=body.type,
+            description=body.description,
+            observation=body.observation,
+            doctor_name=body.doctor_name,
+            location_name=body.location_name,
+            location_id=body.location_id,
+            doctor_id=body.doctor_id,
+            user_id=body.user_id,
+            duration_minutes=body.duration_minutes
+        )
+        logger.debug(f"Adicionando event de name: '{event.name}' com id: '{event.id}'")
+        async with SessionAsync() as session:
+            try:
+                await session.run_sync(reserva_escrita)
+                conflitos = await session.run_sync(busca_conflitos, sem_fuso(event.date), event.duration_minutes,
+                                                   event.doctor_id, event.location_id)
+                if conflitos:
+                    await session.rollback()
+                    logger.warning(f"Conflito de agenda ao adicionar event '{event.name}': {conflitos}")
+                    return resposta_conflito(conflitos)
+                session.add(event)
+                await session.run_sync(incrementa_versao, event.user_id)
+                await session.commit()
+                cache.invalida_listagens(event.user_id)
+                logger.debug(f"Adicionado event de name: '{event.name}' com id: '{event.id}'")
+                return {"status": "ok", "msg": "Event adicionado com sucesso.", "data": apresenta_event(event, comentarios=[])}, 200
+            except IntegrityError as e:
+                await session.rollback()
+                error_msg = f"Erro de integridade ao adicionar event: {e.orig if hasattr(e, 'orig') else str(e)}"
+                logger.warning(f"Erro ao adicionar event '{event.name}': {error_msg}")
+                return {"status": "error", "msg": error_msg, "data": {}}, 409
+            except Exception as e:
+                await session.rollback()
+                error_msg = "Não foi possível salvar novo item :/"
+                logger.warning(f"Erro ao adicionar event '{event.name}': {error_msg} - {e}")
+                return {"status": "error", "msg": error_msg, "data": {}}, 400
+
+    #GET
+    async def get_events(query: EventListagemBuscaSchema, if_none_match=None):
+        """
+        Mesma listagem do EventService.get_events (keyset, filtros de data, ETag e cache).
+        'if_none_match' recebe os ETags do cabeçalho If-None-Match já interpretados.
+        """
+        logger.debug("Coletando events")
+        try:
+            inicio, fim, parametros = periodo_listagem(query)
+        except ValueError as e:
+            return {"status": "error", "msg": str(e), "data": {}}, 400
+
+        async with SessionAsync() as session:
+            versao = None
+            cabecalhos = {}
+            if query.user_id:
+                versao = await session.run_sync(obtem_versao, query.user_id)
+                etag = gera_etag(query.user_id, versao, *parametros)
+                cabecalhos = cabecalhos_etag(etag)
+                if if_none_match is not None and if_none_match.contains_weak(etag):
+                    logger.debug(f"Listagem do user_id {query.user_id} não modificada")
+                    return "", 304, cabecalhos
+
+            # como em EventService.get_events, só as listagens de um usuário vão para o cache
+            chave_cache = (versao, *parametros)
+            em_cache = cache.listagem_cache.get(query.user_id, chave_cache) if query.user_id else None
+            if em_cache is not None:
+                msg, data = em_cache
+                logger.debug(f"Listagem do user_id {query.user_id} servida do cache")
+                return {"status": "ok", "msg": msg, "data": data}, 200, cabecalhos
+
+            linhas = (await session.execute(consulta_listagem(query, inicio, fim))).all()
+            metrics.observa_linhas_listagem(len(linhas))
+            msg, data = apresenta_listagem(query, linhas)
+            if query.user_id:
+                cache.listagem_cache.set(query.user_id, chave_cache, (msg, data))
+            return {"status": "ok", "msg": msg, "data": data}, 200, cabecalhos
+
+    #GET
+    async def get_next_events(query: EventProximosBuscaSchema, if_none_match=None):
+        listagem = EventListagemBuscaSchema(user_id=query.user_id, limit=query.n, upcoming=True)
+        return await AsyncEventService.get_events(listagem, if_none_match)
+
+    #GET
+    async def get_event(query: EventDetalheBuscaSchema):
+        event_id = query.id
+        logger.debug(f"Coletando dados sobre event #{event_id}")
+        carregamento = carrega_campos(query.fields) if query.fields else joinedload(Event.comentarios)
+        async with SessionAsync() as session:
+            resultado = await session.execute(
+                select(Event)
+                .options(carregamento)
+                .where(Event.name == event_id)
+            )
+            event = resultado.unique().scalars().first()
+            if not event:
+                error_msg = "Event não encontrado na base :/"
+                logger.warning(f"Erro ao buscar event '{event_id}': {error_msg}")
+                return {"status": "error", "msg": error_msg, "data": {}}, 404
+            logger.debug(f"Event encontrado: '{event.id}'")
+            return {"status": "ok", "msg": "Event encontrado.", "data": apresenta_event(event, campos=query.fields)}, 200
+
+    #DELETE
+    async def del_event_by_id_and_user(query: EventBuscaSchema):
+        """
+        Deleta um event específico utilizando os campos 'id' e 'user_id' informados no query.
+        Retorna no campo "data" os dados do event que foi deletado.
+        """
+        event_id, user_id = query.id, query.user_id
+        if not user_id:
+            return {"status": "error", "msg": "Missing user_id in query", "data": {}}, 400
+
+        async with SessionAsync() as session:
+            resultado = await session.execute(
+                select(Event)
+                .options(joinedload(Event.comentarios))
+                .where(Event.id == event_id, Event.user_id == user_id)
+            )
+            event = resultado.unique().scalars().first()
+            if not event:
+                return {"status": "error", "msg": "Event não encontrado ou não pertence ao usuário", "data": {}}, 404
+
+            event_data = apresenta_event(event)
+            await session.execute(
+                delete(Event)
+                .where(Event.id == event_id, Event.user_id == user_id)
+                .execution_options(synchronize_session=False)
+            )
+            await session.run_sync(incrementa_versao, user_id)
+            await session.commit()
+            cache.invalida_listagens(user_id)
+            return {"status": "ok", "msg": "Event removido", "data": event_data}, 200
+
+    #PUT
+    async def update_event(query: EventBuscaSchema, body: EventSchema):
+        event_id, user_id = query.id, query.user_id
+        async with SessionAsync() as session:
+            await session.run_sync(reserva_escrita)
+            resultado = await session.execute(
+                select(Event)
+                .options(joinedload(Event.comentarios))
+                .where(Event.id == event_id, Event.user_id == user_id)
+            )
+            event = resultado.unique().scalars().first()
+            if not event:
+                error_msg = "Event não encontrado ou não pertence ao usuário"
+                logger.warning(f"Erro ao atualizar event '{event_id}': {error_msg}")
+                return {"status": "error", "msg": error_msg, "data": {}}, 404
+            try:
+                user_id_anterior = event.user_id
+                for key, value in body.dict(exclude_unset=True).items():
+                    if key == "type" and hasattr(value, "value"):
+                        value = value.value
+                    setattr(event, key, value)
+                event.updated_at = datetime.now()
+                conflitos = await session.run_sync(busca_conflitos, sem_fuso(event.date), event.duration_minutes,
+                                                   event.doctor_id, event.location_id, ignorar_id=event.id)
+                if conflitos:
+                    await session.rollback()
+                    logger.warning(f"Conflito de agenda ao atualizar event '{event_id}': {conflitos}")
+                    return resposta_conflito(conflitos)
+                await session.run_sync(incrementa_versao, user_id_anterior, event.user_id)
+                await session.commit()
+                cache.invalida_listagens(user_id_anterior, event.user_id)
+                logger.debug(f"Event atualizado: '{event.id}'")
+                return {"status": "ok", "msg": "Event atualizado com sucesso.", "data": apresenta_event(event)}, 200
+            except IntegrityError as e:
+                await session.rollback()
+                detail = e.orig if hasattr(e, 'orig') else str(e)
+                error_msg = f"Erro de integridade ao atualizar event: {detail}"
+                logger.warning(f"Erro ao atualizar event '{event_id}': {error_msg}")
+                return {"status": "error", "msg": error_msg, "data": {}}, 409
+            except Exception as e:
+                await session.rollback()
+                error_msg = f"Não foi possível atualizar o event: {str(e)}"
+                logger.warning(f"Erro ao atualizar event '{event_id}': {error_msg}")
+                return {"status": "error", "msg": error_msg, "data": {}}, 400
@@ -0,0 +1,129 @@
+"""
+Métricas no formato texto do Prometheus, expostas em GET /metrics: requisições e
+latência por rota e status, conexões do pool da engine, linhas lidas pelas
+listagens, contadores dos caches e registros de log descartados.
+
+Com vários workers do gunicorn, PROMETHEUS_MULTIPROC_DIR (definida em
+gunicorn.conf.py) faz cada processo gravar os valores em arquivos mmap nesse
+diretório, e o /metrics de qualquer worker soma os de todos.
+"""
+import os
+import time
+
+from flask import request
+
+from logger import registros_descartados
+from services import cache
+
+try:
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, \
+                                  CONTENT_TYPE_LATEST, generate_latest, multiprocess
+except ImportError:
+    Counter = None
+
+
+if Counter is not None:
+    REQUISICOES = Counter("http_requests_total", "Requisições atendidas",
+                          ["metodo", "rota", "status"])
+    LATENCIA = Histogram("http_request_duration_seconds", "Duração das requisições",
+                         ["metodo", "rota"])
+    LINHAS_LISTAGEM = Histogram("appointments_listagem_linhas", "Linhas lidas do banco por listagem de events",
+                                buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, float("inf")))
+    POOL = Gauge("db_pool_conexoes", "Conexões do pool da engine por estado",
+                 ["estado"], multiprocess_mode="livesum")
+    CACHE_TAMANHO = Gauge("cache_itens", "Itens em cada cache", ["cache"], multiprocess_mode="livesum")
+    CACHE_EVENTOS = Counter("cache_eventos_total", "Acertos, faltas, descartes e invalidações dos caches",
+                            ["cache", "evento"])
+    LOG_DESCARTADOS = Counter("log_registros_descartados_total", "Registros de log descartados por fila cheia")
+
+# intervalo mínimo, em segundos, entre amostragens do estado feitas fora do /metrics
+INTERVALO_ESTADO = float(os.getenv("METRICS_STATE_INTERVAL", "5"))
+_amostragem = {"ultima": 0.0}
+
+# últimos valores copiados para cada métrica de estado; os contadores acumulados
+# pelo processo (caches e log) incrementam as métricas só com a diferença
+_ultimos = {}
+os.register_at_fork(after_in_child=_ultimos.clear)
+
+
+def habilitadas() -> bool:
+    return Counter is not None
+
+
+def _incrementa(metrica, valor):
+    anterior = _ultimos.get(metrica, 0)
+    # um valor menor indica que o contador foi reiniciado (ex.: backend trocado)
+    diferenca = valor - anterior if valor >= anterior else valor
+    if diferenca:
+        metrica.inc(diferenca)
+    _ultimos[metrica] = valor
+
+
+def _define(metrica, valor):
+    # cada escrita no modo multiprocesso é um acesso ao mmap: só grava se mudou
+    if _ultimos.get(metrica) != valor:
+        metrica.set(valor)
+        _ultimos[metrica] = valor
+
+
+def atualiza_estado(engine):
+    """Copia para as métricas o estado atual do pool, dos caches e da fila de log."""
+    pool = engine.pool
+    # StaticPool/SingletonThreadPool (sqlite em memória) não expõem esses contadores
+    for estado in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, estado):
+            _define(POOL.labels(estado), getattr(pool, estado)())
+
+    for nome, backend in (("listagem", cache.listagem_cache), ("comprimidas", cache.comprimidas_cache)):
+        stats = backend.stats()
+        _define(CACHE_TAMANHO.labels(nome), stats["size"])
+        for evento in ("hits", "misses", "evictions", "invalidations"):
+            _incrementa(CACHE_EVENTOS.labels(nome, evento), stats[evento])
+
+    _incrementa(LOG_DESCARTADOS, registros_descartados())
+
+
+def observa_linhas_listagem(quantidade: int):
+    """Registra quantas linhas uma listagem de events leu do banco."""
+    if Counter is not None:
+        LINHAS_LISTAGEM.observe(quantidade)
+
+
+def exporta(engine):
+    """Retorna o corpo e o content-type do /metrics, somando os workers se houver."""
+    atualiza_estado(engine)
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+def configura_metricas(app, engine):
+    """Registra no app a contagem e a latência das requisições por rota e status."""
+    if Counter is None:
+        return
+    multiprocesso = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+    @app.before_request
+    def inicia_requisicao():
+        request.environ["metrics.inicio"] = time.perf_counter()
+
+    @app.after_request
+    def registra_requisicao(response):
+        inicio = request.environ.get("metrics.inicio")
+        if inicio is None:
+            return response
+        # a regra (ex.: /appointment) e não o path, para não criar uma série por url
+        rota = request.url_rule.rule if request.url_rule else "desconhecida"
+        LATENCIA.labels(request.method, rota).observe(time.perf_counter() - inicio)
+        REQUISICOES.labels(request.method, rota, str(response.status_code)).inc()
+        if multiprocesso:
+            # o /metrics soma os arquivos de todos os workers, mas só quem atende o scrape
+            # amostra o próprio estado; os demais atualizam o seu de tempos em tempos
+            agora = time.monotonic()
+            if agora - _amostragem["ultima"] >= INTERVALO_ESTADO:
+                _amostragem["ultima"] = agora
+                atualiza_estado(engine)
+        return response
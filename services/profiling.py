@@ -0,0 +1,172 @@
+"""
+Instrumentação opcional de cada requisição (PROFILING=true): tempo e quantidade de
+comandos SQL (eventos da engine), validação pydantic do flask-openapi3 e serialização
+JSON, enviados no header Server-Timing e numa linha de log estruturada.
+
+Com PROFILING_SAMPLE_RATE=N, 1 a cada N requisições é executada sob o cProfile e o
+resultado é gravado em PROFILING_DIR (um arquivo .prof por requisição, que pode ser
+aberto com `python -m pstats` ou snakeviz).
+
+Desligada, nenhum hook é registrado e o custo por requisição é zero.
+"""
+import cProfile
+import itertools
+import json
+import os
+import time
+from contextvars import ContextVar
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import event
+
+from logger import logger
+
+
+# medição da requisição em andamento no contexto atual; None fora de uma requisição
+_medicao = ContextVar("medicao_profiling", default=None)
+
+
+class Medicao:
+    """Tempos (em segundos) acumulados durante uma requisição."""
+    __slots__ = ("inicio", "sql", "sql_quantidade", "validacao", "serializacao", "perfil")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.sql = 0.0
+        self.sql_quantidade = 0
+        self.validacao = 0.0
+        self.serializacao = 0.0
+        self.perfil = None
+
+
+def instrumenta_engine(engine):
+    """Conta e cronometra os comandos SQL da engine executados dentro de uma requisição."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def inicia_comando(conn, cursor, statement, parameters, context, executemany):
+        if _medicao.get() is not None:
+            conn.info.setdefault("profiling_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def finaliza_comando(conn, cursor, statement, parameters, context, executemany):
+        medicao = _medicao.get()
+        inicios = conn.info.get("profiling_inicio")
+        if medicao is None or not inicios:
+            return
+        medicao.sql += time.perf_counter() - inicios.pop()
+        medicao.sql_quantidade += 1
+
+
+def _cronometra(funcao, campo):
+    """Envolve a função somando o tempo de cada chamada ao campo da Medicao atual."""
+    def cronometrada(*args, **kwargs):
+        medicao = _medicao.get()
+        if medicao is None:
+            return funcao(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            setattr(medicao, campo, getattr(medicao, campo) + time.perf_counter() - inicio)
+    return cronometrada
+
+
+def _instrumenta_validacao():
+    # o flask-openapi3 valida header/query/body com pydantic em _validate_request,
+    # buscado no módulo a cada requisição; não há hook público para cronometrá-lo
+    from flask_openapi3 import scaffold
+
+    if not getattr(scaffold._validate_request, "profiling", False):
+        scaffold._validate_request = _cronometra(scaffold._validate_request, "validacao")
+        scaffold._validate_request.profiling = True
+
+
+def server_timing(medicao, total) -> str:
+    """Monta o valor do header Server-Timing (durações em ms)."""
+    sql = medicao.sql * 1000
+    validacao = medicao.validacao * 1000
+    serializacao = medicao.serializacao * 1000
+    app = max(total * 1000 - sql - validacao - serializacao, 0.0)
+    return (f'db;dur={sql:.2f};desc="{medicao.sql_quantidade} queries", '
+            f"validacao;dur={validacao:.2f}, serializacao;dur={serializacao:.2f}, "
+            f"app;dur={app:.2f}, total;dur={total * 1000:.2f}")
+
+
+def _grava_perfil(perfil, diretorio):
+    nome = "%s-%s-%s-%d.prof" % (
+        datetime.now().strftime("%Y%m%dT%H%M%S%f"), request.method,
+        request.path.strip("/").replace("/", "_") or "raiz", os.getpid())
+    caminho = os.path.join(diretorio, nome)
+    perfil.dump_stats(caminho)
+    return caminho
+
+
+def configura_profiling(app, engine, habilitado: bool = None, amostragem: int = None, diretorio: str = None):
+    """
+    Registra a instrumentação no app se PROFILING=true (ou habilitado=True).
+    amostragem (PROFILING_SAMPLE_RATE) é o N do cProfile em 1 a cada N requisições
+    (0 desliga); diretorio (PROFILING_DIR) recebe os arquivos .prof.
+    """
+    if habilitado is None:
+        habilitado = os.getenv("PROFILING", "false").lower() == "true"
+    if not habilitado:
+        return
+    if amostragem is None:
+        amostragem = int(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    diretorio = diretorio or os.getenv("PROFILING_DIR", "log/profiles")
+    if amostragem > 0 and not os.path.exists(diretorio):
+        os.makedirs(diretorio)
+
+    instrumenta_engine(engine)
+    _instrumenta_validacao()
+    # dicts e listas retornados pelas rotas viram JSON em app.json.response
+    app.json.response = _cronometra(app.json.response, "serializacao")
+    contador = itertools.count(1)
+
+    @app.before_request
+    def inicia_medicao():
+        medicao = Medicao()
+        if amostragem > 0 and next(contador) % amostragem == 0:
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+                medicao.perfil = perfil
+            except ValueError:
+                # outro profiler já está ativo (ex.: requisição concorrente amostrada)
+                pass
+        request.environ["profiling.token"] = _medicao.set(medicao)
+
+    @app.after_request
+    def finaliza_medicao(response):
+        medicao = _medicao.get()
+        if medicao is None:
+            return response
+        total = time.perf_counter() - medicao.inicio
+        registro = {
+            "metodo": request.method,
+            "rota": request.url_rule.rule if request.url_rule else request.path,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "sql_ms": round(medicao.sql * 1000, 2),
+            "sql_quantidade": medicao.sql_quantidade,
+            "validacao_ms": round(medicao.validacao * 1000, 2),
+            "serializacao_ms": round(medicao.serializacao * 1000, 2),
+        }
+        if medicao.perfil is not None:
+            medicao.perfil.disable()
+            registro["perfil"] = _grava_perfil(medicao.perfil, diretorio)
+            medicao.perfil = None
+        response.headers["Server-Timing"] = server_timing(medicao, total)
+        logger.info("profiling %s", json.dumps(registro))
+        return response
+
+    @app.teardown_request
+    def descarta_medicao(exc):
+        token = request.environ.pop("profiling.token", None)
+        if token is None:
+            return
+        medicao = _medicao.get()
+        if medicao is not None and medicao.perfil is not None:
+            # a requisição terminou em exceção antes do after_request
+            medicao.perfil.disable()
+        _medicao.reset(token)
@@ -0,0 +1,40 @@
+import os
+import threading
+from sqlalchemy import select, text
+
+from model import Session, Event, UserVersion
+from logger import logger
+
+# indica se o processo atual já aqueceu o banco; cada worker começa não pronto
+_pronto = threading.Event()
+os.register_at_fork(after_in_child=_pronto.clear)
+
+
+def aquece_banco() -> bool:
+    """
+    Abre uma conexão do pool e executa as leituras usadas pelas listagens, trazendo
+    para o cache as páginas dos índices de events e da tabela de versões.
+    Marca o processo como pronto se tudo der certo.
+    """
+    session = Session()
+    try:
+        session.execute(text("SELECT 1"))
+        session.execute(select(Event.id).order_by(Event.user_id, Event.date, Event.id).limit(1)).all()
+        session.execute(select(Event.id).order_by(Event.date, Event.id).limit(1)).all()
+        session.execute(select(UserVersion.version).limit(1)).all()
+    except Exception as e:
+        logger.warning(f"Falha ao aquecer o banco: {e}")
+        return False
+    finally:
+        session.close()
+    _pronto.set()
+    logger.info(f"Banco aquecido no processo {os.getpid()}")
+    return True
+
+
+def esta_pronto() -> bool:
+    """
+    Retorna se o processo está pronto para receber tráfego. Se o aquecimento ainda
+    não ocorreu (ex.: fora do gunicorn) ele é tentado agora.
+    """
+    return _pronto.is_set() or aquece_banco()
@@ -0,0 +1,37 @@
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from model import UserVersion
+
+
+def incrementa_versao(session, *user_ids):
+    """
+    Incrementa, na transação da session, a versão dos events dos usuários informados.
+    Deve ser chamada antes do commit da escrita para que versão e dados mudem juntos.
+    """
+    dialeto = session.get_bind().dialect.name
+    for user_id in set(user_ids):
+        if dialeto in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialeto == "sqlite" else postgresql.insert
+            comando = insert(UserVersion).values(user_id=user_id, version=1).on_conflict_do_update(
+                index_elements=[UserVersion.user_id],
+                set_={"version": UserVersion.version + 1},
+            )
+            session.execute(comando)
+            continue
+        atualizados = session.execute(
+            update(UserVersion)
+            .where(UserVersion.user_id == user_id)
+            .values(version=UserVersion.version + 1)
+        ).rowcount
+        if not atualizados:
+            session.add(UserVersion(user_id, version=1))
+            session.flush()
+
+
+def obtem_versao(session, user_id) -> int:
+    """
+    Retorna a versão atual dos events do usuário (0 se ele nunca teve escritas).
+    """
+    versao = session.query(UserVersion.version).filter(UserVersion.user_id == user_id).scalar()
+    return versao or 0
@@ -0,0 +1,34 @@
+import sys
+import os
+# Add the project's root directory to PYTHONPATH
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+import model
+from app import app
+from model import Base, Session
+from model.database import cria_engine
+from services import cache
+
+
+@pytest.fixture
+def banco(tmp_path):
+    # Aponta a Session para um banco sqlite temporário, isolando os testes
+    # que usam o EventService de verdade do banco em database/
+    engine = cria_engine("sqlite:///%s" % (tmp_path / "test.sqlite3"))
+    Base.metadata.create_all(engine)
+    Session.configure(bind=engine)
+    cache.listagem_cache.limpa()
+    cache.comprimidas_cache.limpa()
+    yield engine
+    cache.listagem_cache.limpa()
+    cache.comprimidas_cache.limpa()
+    Session.configure(bind=model.engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(banco):
+    with app.test_client() as client:
+        yield client
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from starlette.testclient import TestClient
+
+from asgi import asgi_app
+from model.async_session import SessionAsync, engine_async
+from model.database import cria_engine_async
+
+
+@pytest.fixture
+def asgi_client(banco):
+    # a engine assíncrona aponta para o mesmo banco temporário da fixture 'banco'
+    engine = cria_engine_async(str(banco.url))
+    SessionAsync.configure(bind=engine)
+    with TestClient(asgi_app) as client:
+        yield client
+    SessionAsync.configure(bind=engine_async)
+    asyncio.run(engine.dispose())
+
+
+def test_asgi_crud_and_listing(asgi_client):
+    payload = {"name": "Consulta async", "date": "2024-03-01T10:00:00", "user_id": "user-a", "type": 1,
+               "doctor_id": 7, "duration_minutes": 30}
+    response = asgi_client.post("/appointment", json=payload)
+    assert response.status_code == 200
+    event_id = response.json()["data"]["id"]
+
+    conflito = asgi_client.post("/appointment", json={**payload, "name": "Outra", "date": "2024-03-01T10:15:00"})
+    assert conflito.status_code == 409
+
+    response = asgi_client.get("/appointments?user_id=user-a&limit=10")
+    assert response.status_code == 200
+    assert [e["id"] for e in response.json()["data"]["events"]] == [event_id]
+    assert response.json()["data"]["events"][0]["date"] == "Fri, 01 Mar 2024 10:00:00 GMT"
+
+    revalidacao = asgi_client.get("/appointments?user_id=user-a&limit=10",
+                             headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidacao.status_code == 304
+
+    response = asgi_client.put(f"/appointment?id={event_id}&user_id=user-a", json={**payload, "name": "Renomeado"})
+    assert response.status_code == 200
+    assert response.json()["data"]["name"] == "Renomeado"
+
+    response = asgi_client.delete(f"/appointment?id={event_id}&user_id=user-a")
+    assert response.status_code == 200
+    assert asgi_client.get("/appointments?user_id=user-a").json()["data"]["events"] == []
+
+
+def test_asgi_falls_back_to_flask_routes(asgi_client):
+    assert asgi_client.get("/appointments?limit=0").status_code == 422
+    assert asgi_client.get("/cache/stats").status_code == 200
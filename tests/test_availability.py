@@ -0,0 +1,39 @@
+from datetime import datetime, time, timedelta
+
+from model import Session, Event
+from model.event import EventType
+from services.agenda import horarios_livres, janelas_de_expediente, mescla_intervalos
+
+
+def test_horarios_livres_ignora_intervalos_ocupados():
+    segunda = datetime(2024, 5, 6)
+    ocupados = mescla_intervalos([
+        (segunda.replace(hour=9), segunda.replace(hour=10)),
+        (segunda.replace(hour=9, minute=30), segunda.replace(hour=10, minute=30)),
+        (segunda.replace(hour=11), segunda.replace(hour=11)),
+    ])
+    janelas = janelas_de_expediente(datetime(2024, 5, 4), datetime(2024, 5, 7), time(8), time(12), {0, 1, 2, 3, 4})
+
+    livres = horarios_livres(ocupados, janelas, timedelta(minutes=30))
+
+    assert [h.strftime("%H:%M") for h in livres] == ["08:00", "08:30", "10:30", "11:30"]
+
+
+def test_get_availability_for_many_doctors(client):
+    session = Session()
+    session.add(Event(id="a", name="A", date=datetime(2024, 5, 6, 8, 0), type=EventType.CONSULTATION,
+                      doctor_id=1, duration_minutes=60))
+    session.add(Event(id="b", name="B", date=datetime(2024, 5, 6, 8, 0), type=EventType.CONSULTATION,
+                      doctor_id=2, duration_minutes=30))
+    session.commit()
+    session.close()
+
+    response = client.get("/availability?doctor_id=1&doctor_id=2&doctor_id=3&from=2024-05-06T00:00:00"
+                          "&to=2024-05-07T00:00:00&slot_minutes=30&work_start=08:00&work_end=10:00&first_only=true")
+    assert response.status_code == 200
+    agendas = response.get_json()["data"]["agendas"]
+    assert [(a["doctor_id"], a["first_available"]) for a in agendas] == [
+        (1, "Mon, 06 May 2024 09:00:00 GMT"),
+        (2, "Mon, 06 May 2024 08:30:00 GMT"),
+        (3, "Mon, 06 May 2024 08:00:00 GMT"),
+    ]
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from services.cache import CacheBackend, LRUCache
+
+
+def test_lru_cache_descarta_menos_usado():
+    lru = LRUCache(maxsize=2, ttl=60)
+    lru.set("a", 1, "a1")
+    lru.set("b", 1, "b1")
+    assert lru.get("a", 1) == "a1"
+    lru.set("c", 1, "c1")
+
+    assert lru.get("b", 1) is None
+    assert lru.get("a", 1) == "a1"
+    stats = lru.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (2, 1, 1, 2)
+
+
+def test_lru_cache_expira_por_ttl():
+    lru = LRUCache(maxsize=10, ttl=0.01)
+    lru.set("a", 1, "a1")
+    time.sleep(0.02)
+    assert lru.get("a", 1) is None
+    assert lru.stats()["size"] == 0
+
+
+def test_lru_cache_invalida_apenas_o_usuario():
+    lru = LRUCache(maxsize=10, ttl=60)
+    lru.set("a", (None, None), "a1")
+    lru.set("a", (10, None), "a2")
+    lru.set("b", (None, None), "b1")
+
+    lru.invalida_usuario("a")
+
+    assert lru.get("a", (None, None)) is None
+    assert lru.get("a", (10, None)) is None
+    assert lru.get("b", (None, None)) == "b1"
+    assert lru.stats()["invalidations"] == 2
+
+
+def test_backend_incompleto_falha_ao_ser_criado():
+    class SemStats(CacheBackend):
+        def get(self, user_id, chave):
+            return None
+
+        def set(self, user_id, chave, valor):
+            pass
+
+        def invalida_usuario(self, user_id):
+            pass
+
+        def limpa(self):
+            pass
+
+    with pytest.raises(TypeError):
+        SemStats()
@@ -0,0 +1,466 @@
+import gzip
+import json
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event as sa_event, select
+
+from app import app
+from model import Session, Event, Comentario
+from model.event import EventType
+from services import cache
+
+
+def cria_events(user_id, quantidade, inicio=datetime(2024, 1, 1, 8, 0)):
+    session = Session()
+    for i in range(quantidade):
+        session.add(Event(
+            id=f"{user_id}-{i:04d}",
+            name=f"Consulta {user_id} {i}",
+            date=inicio + timedelta(hours=i),
+            type=EventType.CONSULTATION,
+            user_id=user_id,
+        ))
+    session.commit()
+    session.close()
+
+
+def test_get_appointments_paginated(client):
+    cria_events("user-a", 5)
+    cria_events("user-b", 3)
+
+    ids = []
+    cursor = None
+    while True:
+        url = "/appointments?user_id=user-a&limit=2"
+        if cursor:
+            url += f"&cursor={cursor}"
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.get_json()["data"]
+        ids += [e["id"] for e in data["events"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert ids == [f"user-a-{i:04d}" for i in range(5)]
+
+
+def test_unfiltered_listing_is_not_cached(client):
+    cria_events("user-a", 2)
+    assert len(client.get("/appointments").get_json()["data"]["events"]) == 2
+
+    # gravação feita por outro worker: o cache deste processo não é invalidado
+    cria_events("user-b", 1)
+    assert len(client.get("/appointments").get_json()["data"]["events"]) == 3
+    assert cache.listagem_cache.stats()["size"] == 0
+
+
+def test_listing_rows_match_orm_presenter(client):
+    from schemas.event import apresenta_events, apresenta_linhas
+    from services.event import COLUNAS_LISTAGEM
+
+    cria_events("user-a", 2)
+    session = Session()
+    session.add(Event(id="user-a-completo", name="Completo", date=datetime(2024, 2, 1, 9, 0),
+                      type=EventType.EXAM, user_id="user-a", doctor_id=7, location_id=3,
+                      doctor_name="Dr. X", location_name="Clínica", duration_minutes=45))
+    session.commit()
+
+    # os dois primeiros ficam com doctor_id, location_id e duration_minutes nulos
+    linhas = session.execute(select(*COLUNAS_LISTAGEM).order_by(Event.date, Event.id)).all()
+    objs = session.query(Event).order_by(Event.date, Event.id).all()
+    assert app.json.dumps(apresenta_linhas(linhas, "c")) == app.json.dumps(apresenta_events(objs, "c"))
+
+    campos = ["id", "date", "duration_minutes"]
+    linhas = session.execute(select(Event.id, Event.date, Event.duration_minutes).order_by(Event.date, Event.id)).all()
+    assert app.json.dumps(apresenta_linhas(linhas, campos=campos)) == app.json.dumps(apresenta_events(objs, campos=campos))
+    session.close()
+
+
+def test_empty_listing_shape(client):
+    # a listagem vazia tem o mesmo formato da preenchida, com ou sem paginação
+    for url in ("/appointments", "/appointments?user_id=user-a", "/appointments?user_id=user-a&limit=2"):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.get_json()["data"] == {"events": [], "next_cursor": None}
+
+
+def test_comment_changes_listing_count_and_etag(client):
+    from types import SimpleNamespace
+    from services.event import EventService
+
+    cria_events("user-a", 1)
+    url = "/appointments?user_id=user-a&with_total_comentarios=true"
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    assert response.get_json()["data"]["events"][0]["total_cometarios"] == 0
+
+    _, status = EventService.add_comentario(SimpleNamespace(event_id="user-a-0000", texto="Levar exames"))
+    assert status == 200
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["data"]["events"][0]["total_cometarios"] == 1
+
+
+def test_get_appointments_invalid_cursor(client):
+    response = client.get("/appointments?limit=2&cursor=nao-e-um-cursor")
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+
+
+def test_export_appointments_ndjson(client):
+    cria_events("user-a", 3)
+    cria_events("user-b", 2)
+
+    response = client.get("/appointments/export?user_id=user-a")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    linhas = [json.loads(linha) for linha in response.get_data(as_text=True).splitlines()]
+    assert [linha["id"] for linha in linhas] == [f"user-a-{i:04d}" for i in range(3)]
+    assert linhas[0]["date"] == "2024-01-01T08:00:00"
+
+
+def test_add_appointments_batch(client):
+    cria_events("user-a", 1)
+    payload = {"events": [
+        {"name": "Lote 1", "date": "2024-02-01T10:00:00", "user_id": "user-a", "type": 1},
+        {"name": "Consulta user-a 0", "date": "2024-02-02T10:00:00", "user_id": "user-a", "type": 1},
+        {"name": "Lote 2", "date": "2024-02-03T10:00:00", "user_id": "user-a", "type": 2},
+        {"name": "Lote 1", "date": "2024-02-04T10:00:00", "user_id": "user-a", "type": 1},
+    ]}
+    response = client.post("/appointments/batch", json=payload)
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert [r["status"] for r in data["results"]] == [200, 409, 200, 409]
+    assert (data["created"], data["failed"]) == (2, 2)
+
+    session = Session()
+    assert session.query(Event).filter(Event.user_id == "user-a").count() == 3
+    session.close()
+
+
+def test_bulk_update_and_delete_scoped_to_user(client):
+    cria_events("user-a", 3)
+    cria_events("user-b", 1)
+
+    response = client.patch("/appointments", json={
+        "user_id": "user-a",
+        "ids": ["user-a-0000", "user-a-0001", "user-b-0000"],
+        "changes": {"observation": "Levar exames", "type": 2},
+    })
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert sorted(data["affected"]) == ["user-a-0000", "user-a-0001"]
+    assert data["not_found"] == ["user-b-0000"]
+
+    response = client.delete("/appointments", json={
+        "user_id": "user-a",
+        "ids": ["user-a-0000", "user-a-0002", "user-b-0000"],
+    })
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert sorted(data["affected"]) == ["user-a-0000", "user-a-0002"]
+
+    session = Session()
+    restantes = {e.id: e for e in session.query(Event)}
+    assert sorted(restantes) == ["user-a-0001", "user-b-0000"]
+    assert restantes["user-a-0001"].observation == "Levar exames"
+    assert restantes["user-a-0001"].type == 2
+    assert restantes["user-b-0000"].observation is None
+    session.close()
+
+
+def test_get_appointments_cache_invalidated_on_write(client):
+    cria_events("user-a", 1)
+    assert len(client.get("/appointments?user_id=user-a").get_json()["data"]["events"]) == 1
+    assert len(client.get("/appointments?user_id=user-a").get_json()["data"]["events"]) == 1
+    assert client.get("/cache/stats").get_json()["hits"] >= 1
+
+    client.post("/appointment", json={"name": "Nova", "date": "2024-03-01T10:00:00", "user_id": "user-a", "type": 1})
+    assert len(client.get("/appointments?user_id=user-a").get_json()["data"]["events"]) == 2
+
+
+def test_get_appointments_etag_not_modified(client):
+    cria_events("user-a", 2)
+    response = client.get("/appointments?user_id=user-a")
+    etag = response.headers["ETag"]
+
+    response = client.get("/appointments?user_id=user-a", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+
+    client.delete("/appointment?id=user-a-0000&user_id=user-a")
+    response = client.get("/appointments?user_id=user-a", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.get_json()["data"]["events"]) == 1
+
+
+@contextmanager
+def conta_sql(engine):
+    comandos = []
+
+    def registra(conn, cursor, statement, parameters, context, executemany):
+        # o BEGIN emitido pela engine sqlite é controle de transação, não uma consulta
+        if not statement.startswith("BEGIN"):
+            comandos.append(statement)
+
+    sa_event.listen(engine, "before_cursor_execute", registra)
+    try:
+        yield comandos
+    finally:
+        sa_event.remove(engine, "before_cursor_execute", registra)
+
+
+def cria_comentarios(event_id, quantidade):
+    session = Session()
+    event = session.get(Event, event_id)
+    for i in range(quantidade):
+        event.adiciona_comentario(Comentario(f"Comentário {i}"))
+    session.commit()
+    session.close()
+
+
+def test_single_event_requests_load_comments_without_extra_queries(client, banco):
+    cria_events("user-a", 1)
+    cria_comentarios("user-a-0000", 2)
+
+    with conta_sql(banco) as comandos:
+        response = client.get("/appointment?id=Consulta user-a 0&user_id=user-a")
+    assert response.get_json()["data"]["total_cometarios"] == 2
+    assert len(comandos) == 1
+
+    with conta_sql(banco) as comandos:
+        response = client.put("/appointment?id=user-a-0000&user_id=user-a", json={"observation": "Nova observação"})
+    assert response.get_json()["data"]["total_cometarios"] == 2
+    # SELECT do event com comentários, UPDATE do event e incremento da versão
+    assert len(comandos) == 3
+
+    with conta_sql(banco) as comandos:
+        response = client.delete("/appointment?id=user-a-0000&user_id=user-a")
+    assert response.get_json()["data"]["total_cometarios"] == 2
+    assert not [c for c in comandos if c.lstrip().startswith("SELECT comentario")]
+
+
+def test_list_with_total_comentarios_uses_constant_queries(client, banco):
+    cria_events("user-a", 5)
+    for i in range(5):
+        cria_comentarios(f"user-a-{i:04d}", i)
+
+    with conta_sql(banco) as comandos:
+        response = client.get("/appointments?user_id=user-a&with_total_comentarios=true")
+    events = response.get_json()["data"]["events"]
+    assert [e["total_cometarios"] for e in events] == [0, 1, 2, 3, 4]
+    # versão do usuário e listagem com a contagem de comentários
+    assert len(comandos) == 2
+
+
+def test_get_appointments_date_range_and_next(client):
+    cria_events("user-a", 5, inicio=datetime(2024, 1, 1, 8, 0))
+    cria_events("user-b", 3, inicio=datetime.now() + timedelta(days=1))
+
+    response = client.get("/appointments?user_id=user-a&from=2024-01-01T09:00:00&to=2024-01-01T11:00:00")
+    assert [e["id"] for e in response.get_json()["data"]["events"]] == ["user-a-0001", "user-a-0002"]
+
+    response = client.get("/appointments?user_id=user-a&upcoming=true")
+    assert response.get_json()["data"]["events"] == []
+
+    response = client.get("/appointments/next?user_id=user-b&n=2")
+    data = response.get_json()["data"]
+    assert [e["id"] for e in data["events"]] == ["user-b-0000", "user-b-0001"]
+    assert data["next_cursor"]
+
+
+def test_get_calendar_groups_by_period_and_type(client):
+    cria_events("user-a", 3, inicio=datetime(2024, 1, 6, 22, 0))  # sábado 22h, 23h e domingo 0h
+    session = Session()
+    session.add(Event(id="exame", name="Exame", date=datetime(2024, 1, 8, 9, 0), type=EventType.EXAM, user_id="user-a"))
+    session.commit()
+    session.close()
+
+    data = client.get("/appointments/calendar?user_id=user-a&granularity=day").get_json()["data"]
+    assert data["buckets"] == ["2024-01-06", "2024-01-07", "2024-01-08"]
+    assert data["counts"] == {"CONSULTATION": [2, 1, 0], "EXAM": [0, 0, 1]}
+    assert data["total"] == [2, 1, 1]
+
+    data = client.get("/appointments/calendar?user_id=user-a&granularity=week").get_json()["data"]
+    assert data["buckets"] == ["2024-01-01", "2024-01-08"]
+    assert data["total"] == [3, 1]
+
+    data = client.get("/appointments/calendar?user_id=user-a&granularity=month&from=2024-01-07T00:00:00").get_json()["data"]
+    assert data["buckets"] == ["2024-01-01"]
+    assert data["counts"]["CONSULTATION"] == [1]
+
+
+def test_add_and_update_appointment_reject_doctor_double_booking(client, banco):
+    base = {"date": "2024-05-10T10:00:00", "doctor_id": 7, "location_id": 1, "user_id": "user-a", "type": 1}
+    response = client.post("/appointment", json=dict(base, name="Primeira", duration_minutes=60))
+    assert response.status_code == 200
+    primeira = response.get_json()["data"]["id"]
+
+    with conta_sql(banco) as comandos:
+        response = client.post("/appointment", json=dict(base, name="Sobreposta", date="2024-05-10T10:30:00", duration_minutes=30))
+    assert response.status_code == 409
+    assert response.get_json()["data"]["conflicts"] == [primeira]
+    assert len(comandos) == 1
+
+    response = client.post("/appointment", json=dict(base, name="Seguinte", date="2024-05-10T11:00:00", duration_minutes=30))
+    assert response.status_code == 200
+    seguinte = response.get_json()["data"]["id"]
+
+    response = client.put(f"/appointment?id={seguinte}&user_id=user-a", json={"date": "2024-05-10T10:45:00"})
+    assert response.status_code == 409
+    assert response.get_json()["data"]["conflicts"] == [primeira]
+
+    response = client.post("/appointments/batch", json={"events": [
+        dict(base, name="Lote A", date="2024-05-10T14:00:00", duration_minutes=30),
+        dict(base, name="Lote B", date="2024-05-10T14:15:00", duration_minutes=30),
+    ]})
+    assert [r["status"] for r in response.get_json()["data"]["results"]] == [200, 409]
+
+
+def test_batch_retry_rechecks_conflicts_after_integrity_error(client, monkeypatch):
+    import uuid
+    from services import event as event_service
+
+    base = {"doctor_id": 7, "location_id": 1, "user_id": "user-a", "type": 1, "duration_minutes": 30}
+    existente = client.post("/appointment", json=dict(base, name="Existente", date="2024-05-10T08:00:00"))
+    existente_id = existente.get_json()["data"]["id"]
+
+    # o primeiro item do lote recebe um id já gravado: o insert em lote falha e os
+    # itens são refeitos um a um
+    ids = iter([existente_id, str(uuid.uuid4())])
+    monkeypatch.setattr(event_service.uuid, "uuid4", lambda: next(ids))
+
+    # entre o rollback e a nova tentativa outra requisição agenda o horário do segundo item
+    reserva_original = event_service.reserva_escrita
+    chamadas = []
+
+    def reserva_escrita(session):
+        chamadas.append(session)
+        if len(chamadas) == 2:
+            outra = Session()
+            outra.add(Event(id="concorrente", name="Concorrente", date=datetime(2024, 5, 10, 10, 0),
+                            type=EventType.CONSULTATION, user_id="user-b", doctor_id=7, duration_minutes=30))
+            outra.commit()
+            outra.close()
+        reserva_original(session)
+
+    monkeypatch.setattr(event_service, "reserva_escrita", reserva_escrita)
+    response = client.post("/appointments/batch", json={"events": [
+        dict(base, name="Lote A", date="2024-05-10T09:00:00"),
+        dict(base, name="Lote B", date="2024-05-10T10:00:00"),
+    ]})
+    resultados = response.get_json()["data"]["results"]
+    assert [r["status"] for r in resultados] == [409, 409]
+    assert resultados[1]["data"]["conflicts"] == ["concorrente"]
+
+
+def test_bulk_patch_rejects_doctor_double_booking(client):
+    base = {"doctor_id": 7, "location_id": 1, "user_id": "user-a", "type": 1, "duration_minutes": 30}
+    ids = [
+        client.post("/appointment", json=dict(base, name=name, date=date)).get_json()["data"]["id"]
+        for name, date in (("Primeira", "2024-05-10T10:00:00"), ("Segunda", "2024-05-10T11:00:00"),
+                           ("Terceira", "2024-05-10T12:00:00"))
+    ]
+
+    # um dos events do lote passaria a ocupar o horário de um event de fora do lote
+    response = client.patch("/appointments", json={"user_id": "user-a", "ids": ids[1:2],
+                                                   "changes": {"date": "2024-05-10T10:15:00"}})
+    assert response.status_code == 409
+    assert response.get_json()["data"]["conflicts"] == [ids[0]]
+
+    # os events do lote passariam a ocupar o mesmo horário entre si
+    response = client.patch("/appointments", json={"user_id": "user-a", "ids": ids[1:],
+                                                   "changes": {"date": "2024-05-10T15:00:00"}})
+    assert response.status_code == 409
+    assert response.get_json()["data"]["conflicts"] == [ids[1]]
+    session = Session()
+    assert session.get(Event, ids[2]).date == datetime(2024, 5, 10, 12, 0)
+    session.close()
+
+    # com outro doctor o mesmo horário fica livre o conflito com o event de fora do lote
+    response = client.patch("/appointments", json={"user_id": "user-a", "ids": ids[1:2],
+                                                   "changes": {"date": "2024-05-10T10:15:00", "doctor_id": 8}})
+    assert response.status_code == 200
+    assert response.get_json()["data"]["affected"] == [ids[1]]
+
+
+def test_ready_turns_green_after_database_warm_up(client, monkeypatch):
+    from services import readiness
+
+    monkeypatch.setattr(readiness, "_pronto", readiness.threading.Event())
+    monkeypatch.setattr(readiness, "aquece_banco", lambda: False)
+    assert client.get("/ready").status_code == 503
+
+    monkeypatch.undo()
+    monkeypatch.setattr(readiness, "_pronto", readiness.threading.Event())
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert readiness._pronto.is_set()
+
+
+def test_large_listings_are_compressed_and_cached_by_etag(client):
+    cria_events("user-a", 50)
+
+    response = client.get("/appointments?user_id=user-a", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(gzip.decompress(response.data)) > len(response.data)
+    assert cache.comprimidas_cache.stats()["size"] == 1
+
+    novamente = client.get("/appointments?user_id=user-a", headers={"Accept-Encoding": "gzip"})
+    assert novamente.data == response.data
+    assert cache.comprimidas_cache.stats()["hits"] == 1
+
+    # cada codificação tem o próprio ETag, aceito de volta no If-None-Match
+    identidade = client.get("/appointments?user_id=user-a")
+    assert response.headers["ETag"] == identidade.headers["ETag"][:-1] + '-gzip"'
+    revalidacao = client.get("/appointments?user_id=user-a",
+                             headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+    assert revalidacao.status_code == 304
+    assert revalidacao.headers["ETag"] == response.headers["ETag"]
+    revalidacao = client.get("/appointments?user_id=user-a", headers={"If-None-Match": identidade.headers["ETag"]})
+    assert (revalidacao.status_code, revalidacao.headers["ETag"]) == (304, identidade.headers["ETag"])
+
+    pequena = client.get("/appointments?user_id=ninguem", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in pequena.headers
+    assert "Content-Encoding" not in client.get("/appointments?user_id=user-a").headers
+
+
+def test_compressed_static_files_get_their_own_strong_etag(client):
+    url = "/openapi/swagger/js/swagger-ui-bundle.js"
+    identidade = client.get(url)
+    if identidade.status_code != 200 or not identidade.headers.get("ETag"):
+        pytest.skip("assets do Swagger UI não instalados")
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert not response.headers["ETag"].startswith("W/")
+    assert response.headers["ETag"] == identidade.headers["ETag"][:-1] + '-gzip"'
+
+    revalidacao = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+    assert (revalidacao.status_code, revalidacao.headers["ETag"]) == (304, response.headers["ETag"])
+
+
+def test_fields_projection_narrows_select_and_payload(client, banco):
+    cria_events("user-a", 3)
+
+    with conta_sql(banco) as sqls:
+        response = client.get("/appointments?user_id=user-a&limit=2&fields=name,date")
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert [set(e) for e in data["events"]] == [{"id", "name", "date"}] * 2
+    consulta = [sql for sql in sqls if "FROM event" in sql and "user_version" not in sql][0]
+    assert "description" not in consulta and "observation" not in consulta
+
+    proxima = client.get(f"/appointments?user_id=user-a&limit=2&fields=name&cursor={data['next_cursor']}")
+    assert [e["id"] for e in proxima.get_json()["data"]["events"]] == ["user-a-0002"]
+
+    detalhe = client.get("/appointment?id=Consulta user-a 0&fields=type").get_json()["data"]
+    assert set(detalhe) == {"id", "type"}
+
+    assert client.get("/appointments?fields=name,senha").status_code == 422
@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from json_provider import OrjsonProvider, orjson
+from model.event import EventType
+
+pytestmark = pytest.mark.skipif(orjson is None, reason="orjson não instalado")
+
+
+def test_orjson_provider_keeps_flask_formats(monkeypatch):
+    app = Flask(__name__)
+    valor = {"date": datetime(2024, 3, 1, 10, 0), "type": EventType.CONSULTATION,
+             "id": uuid.UUID(int=1), "preco": Decimal("1.50")}
+
+    assert app.json.loads(OrjsonProvider(app).dumps(valor)) == {
+        "date": "Fri, 01 Mar 2024 10:00:00 GMT",
+        "type": EventType.CONSULTATION.value,
+        "id": "00000000-0000-0000-0000-000000000001",
+        "preco": "1.50",
+    }
+
+    monkeypatch.setenv("JSON_DATETIME_FORMAT", "iso")
+    assert app.json.loads(OrjsonProvider(app).dumps(valor))["date"] == "2024-03-01T10:00:00"
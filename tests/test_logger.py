@@ -0,0 +1,40 @@
+import logging
+import os
+import queue
+
+import pytest
+
+import logger
+from logger import FilaHandler
+
+
+def test_fila_handler_drops_records_when_queue_is_full():
+    fila_handler = FilaHandler(queue.Queue(maxsize=1))
+    alvo = logging.getLogger("test_fila_handler")
+    alvo.propagate = False
+    alvo.addHandler(fila_handler)
+
+    for i in range(3):
+        alvo.warning("registro %s", i)
+
+    assert fila_handler.queue.get_nowait().getMessage() == "registro 0"
+    assert fila_handler.descartados == 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requer fork")
+def test_child_gets_fresh_drop_lock_and_counter(monkeypatch):
+    fila_handler = FilaHandler(queue.Queue(maxsize=1))
+    fila_handler.descartados = 5
+    monkeypatch.setattr(logger, "_filas", [(fila_handler, logger.FilaListener(fila_handler.queue))])
+    # o pai fica com o lock travado no momento do fork
+    fila_handler._lock_descartados.acquire()
+
+    pid = os.fork()
+    if pid == 0:
+        logger._reinicia_filas_pos_fork()
+        ok = fila_handler.descartados == 0 and fila_handler._lock_descartados.acquire(timeout=1)
+        logger.para_filas()
+        os._exit(0 if ok else 1)
+    fila_handler._lock_descartados.release()
+    _, status = os.waitpid(pid, 0)
+    assert status == 0
@@ -0,0 +1,44 @@
+import pytest
+
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+
+def valor(nome, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(nome, labels) or 0
+
+
+def test_metrics_counts_requests_per_route_and_status(client):
+    # o estado dos caches é copiado para as métricas a cada scrape
+    client.get("/metrics")
+    antes = valor("http_requests_total", metodo="GET", rota="/appointments", status="200")
+    linhas_antes = valor("appointments_listagem_linhas_count")
+    faltas_antes = valor("cache_eventos_total", cache="listagem", evento="misses")
+
+    client.get("/appointments?user_id=user-a")
+    client.get("/appointments?user_id=user-a")
+    client.get("/nao-existe")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert valor("http_requests_total", metodo="GET", rota="/appointments", status="200") == antes + 2
+    assert valor("http_request_duration_seconds_count", metodo="GET", rota="/appointments") >= 2
+    assert valor("http_requests_total", metodo="GET", rota="desconhecida", status="404") >= 1
+    # a segunda listagem é servida do cache sem ler linhas do banco
+    assert valor("appointments_listagem_linhas_count") == linhas_antes + 1
+    assert valor("cache_eventos_total", cache="listagem", evento="misses") == faltas_antes + 1
+    assert b"db_pool_conexoes" in response.data
+
+
+def test_state_gauges_are_sampled_only_on_scrape(client, monkeypatch):
+    from services import metrics
+
+    amostragens = []
+    atualiza_estado = metrics.atualiza_estado
+    monkeypatch.setattr(metrics, "atualiza_estado", lambda engine: amostragens.append(atualiza_estado(engine)))
+
+    client.get("/appointments?user_id=user-a")
+    assert amostragens == []
+    client.get("/metrics")
+    assert len(amostragens) == 1
@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, inspect
+
+from model import Base, Event
+from model.migration import adiciona_colunas_ausentes, cria_indices_ausentes
+
+
+def test_cria_indices_ausentes_em_banco_existente(tmp_path):
+    engine = create_engine("sqlite:///%s" % (tmp_path / "antigo.sqlite3"))
+    Base.metadata.create_all(engine)
+    with engine.begin() as conexao:
+        for indice in Event.__table__.indexes:
+            conexao.exec_driver_sql(f"DROP INDEX {indice.name}")
+
+    criados = cria_indices_ausentes(engine)
+
+    declarados = {indice.name for indice in Event.__table__.indexes}
+    existentes = {indice["name"] for indice in inspect(engine).get_indexes("event")}
+    assert set(criados) == declarados
+    assert declarados <= existentes
+    # uma segunda execução não tem nada a fazer
+    assert cria_indices_ausentes(engine) == []
+    engine.dispose()
+
+
+def test_adiciona_colunas_ausentes_em_banco_existente(tmp_path):
+    engine = create_engine("sqlite:///%s" % (tmp_path / "antigo.sqlite3"))
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql("CREATE TABLE event (pk_event VARCHAR(36) PRIMARY KEY, user_id VARCHAR(36) NOT NULL)")
+
+    adicionadas = adiciona_colunas_ausentes(engine)
+
+    assert "event.duration_minutes" in adicionadas
+    colunas = {coluna["name"] for coluna in inspect(engine).get_columns("event")}
+    assert {coluna.name for coluna in Event.__table__.columns} <= colunas
+    assert adiciona_colunas_ausentes(engine) == []
+    engine.dispose()
@@ -0,0 +1,52 @@
+import pstats
+
+from flask_openapi3 import OpenAPI
+
+from schemas.event import EventListagemBuscaSchema
+from services import profiling
+from services.event import EventService
+
+
+def cria_app(engine, **opcoes):
+    app = OpenAPI(__name__)
+    profiling.configura_profiling(app, engine, habilitado=True, **opcoes)
+
+    @app.get('/appointments')
+    def get_events(query: EventListagemBuscaSchema):
+        return EventService.get_events(query)
+
+    return app
+
+
+def test_server_timing_counts_sql_of_the_request(banco):
+    client = cria_app(banco, amostragem=0).test_client()
+
+    response = client.get("/appointments?user_id=user-a")
+
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    for fase in ("db;dur=", "validacao;dur=", "serializacao;dur=", "app;dur=", "total;dur="):
+        assert fase in timing
+    quantidade = int(timing.split('desc="')[1].split(" ")[0])
+    assert quantidade >= 1
+    assert profiling._medicao.get() is None
+
+
+def test_samples_cprofile_one_in_n_requests(banco, tmp_path):
+    diretorio = tmp_path / "profiles"
+    client = cria_app(banco, amostragem=2, diretorio=str(diretorio)).test_client()
+
+    for _ in range(4):
+        client.get("/appointments?user_id=user-a")
+
+    arquivos = sorted(diretorio.iterdir())
+    assert len(arquivos) == 2
+    assert "GET-appointments" in arquivos[0].name
+    assert pstats.Stats(str(arquivos[0])).total_calls > 0
+
+
+def test_disabled_registers_no_hooks(banco):
+    app = OpenAPI(__name__)
+    profiling.configura_profiling(app, banco, habilitado=False)
+
+    assert not app.before_request_funcs and not app.after_request_funcs
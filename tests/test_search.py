@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from model import Session, Event
+from model.event import EventType
+from model.fts import DDL_FTS, DROP_FTS, cria_fts, reconstroi_fts
+
+
+def cria_event(event_id, user_id, name, **campos):
+    session = Session()
+    session.add(Event(id=event_id, name=name, date=datetime(2024, 1, 1, 8, 0) + timedelta(hours=len(event_id)),
+                      type=EventType.CONSULTATION, user_id=user_id, **campos))
+    session.commit()
+    session.close()
+
+
+def busca(client, q, user_id="user-a", **params):
+    response = client.get("/appointments/search", query_string={"user_id": user_id, "q": q, **params})
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+def test_search_ranks_prefix_matches_of_the_user_only(client):
+    cria_event("a1", "user-a", "Retorno", description="Consulta de cardiologia")
+    cria_event("a2", "user-a", "Cardiologia", doctor_name="Dr. Silva")
+    cria_event("a3", "user-a", "Dermatologia")
+    cria_event("b1", "user-b", "Cardiologia anual")
+
+    ids = [e["id"] for e in busca(client, "cardio")["events"]]
+    # a palavra no name pesa mais que na description; o event do user-b não aparece
+    assert ids == ["a2", "a1"]
+    assert [e["id"] for e in busca(client, "cardio silva")["events"]] == ["a2"]
+    # acentos são ignorados e aspas/operadores do FTS5 não quebram a consulta
+    assert [e["id"] for e in busca(client, '"dermatología*')["events"]] == ["a3"]
+
+
+def test_search_follows_writes_and_paginates(client):
+    for i in range(5):
+        cria_event(f"e{i}", "user-a", f"Exame {i}", observation="jejum")
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        data = busca(client, "jejum", **params)
+        ids += [e["id"] for e in data["events"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(ids) == [f"e{i}" for i in range(5)]
+
+    # os triggers mantêm o índice em dia com UPDATE e DELETE, inclusive em lote
+    session = Session()
+    session.execute(update(Event).where(Event.id.in_(["e0", "e1"])).values(observation="sem preparo"))
+    session.query(Event).filter(Event.id == "e2").delete()
+    session.commit()
+    session.close()
+    assert sorted(e["id"] for e in busca(client, "jejum")["events"]) == ["e3", "e4"]
+    assert sorted(e["id"] for e in busca(client, "preparo")["events"]) == ["e0", "e1"]
+
+
+def test_search_etag_and_rebuild(client, banco):
+    cria_event("a1", "user-a", "Retorno")
+    response = client.get("/appointments/search?user_id=user-a&q=retorno")
+    assert client.get("/appointments/search?user_id=user-a&q=retorno",
+                      headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    with banco.begin() as conexao:
+        conexao.exec_driver_sql("INSERT INTO event_fts(event_fts) VALUES ('delete-all')")
+    assert busca(client, "retorno")["events"] == []
+    reconstroi_fts(banco)
+    assert [e["id"] for e in busca(client, "retorno")["events"]] == ["a1"]
+
+
+def test_search_survives_restore_renumbering_rowids(client, banco):
+    for event_id, name in (("a1", "Retorno"), ("a2", "Cardiologia"), ("a3", "Dermatologia")):
+        cria_event(event_id, "user-a", name)
+    session = Session()
+    session.query(Event).filter(Event.id == "a1").delete()
+    session.commit()
+    session.close()
+
+    # restauração como a de um dump: os dados entram antes dos triggers e o rowid da
+    # event, que não vai no dump, é renumerado (o VACUUM também pode renumerá-lo)
+    with banco.begin() as conexao:
+        for comando in DROP_FTS[:3]:
+            conexao.exec_driver_sql(comando)
+        conexao.exec_driver_sql("CREATE TEMP TABLE copia AS SELECT * FROM event")
+        conexao.exec_driver_sql("DELETE FROM event")
+        conexao.exec_driver_sql("INSERT INTO event SELECT * FROM copia")
+        for comando in DDL_FTS[2:]:
+            conexao.exec_driver_sql(comando)
+        assert conexao.exec_driver_sql("SELECT rowid FROM event WHERE pk_event = 'a3'").scalar() == 2
+
+    # sem reconstruir o índice
+    assert [e["id"] for e in busca(client, "dermato")["events"]] == ["a3"]
+    assert [e["id"] for e in busca(client, "cardio")["events"]] == ["a2"]
+    cria_event("a4", "user-a", "Dermatologia infantil")
+    assert sorted(e["id"] for e in busca(client, "dermato")["events"]) == ["a3", "a4"]
+
+
+def test_cria_fts_migrates_an_index_keyed_on_rowid(client, banco):
+    cria_event("a1", "user-a", "Retorno")
+    cria_event("a2", "user-a", "Cardiologia")
+    # índice da versão anterior: view e tabela chaveadas pelo rowid, event sem fts_id
+    with banco.begin() as conexao:
+        for comando in DROP_FTS:
+            conexao.exec_driver_sql(comando)
+        conexao.exec_driver_sql("UPDATE event SET fts_id = NULL")
+        for comando in DDL_FTS[:2]:
+            conexao.exec_driver_sql(comando.replace("fts_id AS id_fts", "rowid AS id_fts"))
+
+    assert cria_fts(banco) is True
+    assert cria_fts(banco) is False
+    assert [e["id"] for e in busca(client, "cardio")["events"]] == ["a2"]
+    cria_event("a3", "user-a", "Cardiologia pediátrica")
+    assert sorted(e["id"] for e in busca(client, "cardio")["events"]) == ["a2", "a3"]
+
+
+def test_search_rejects_query_without_words(client):
+    response = client.get("/appointments/search?user_id=user-a&q=%22%2A")
+    assert response.status_code == 400
@@ -0,0 +1,78 @@
+import json
+import logging
+import os
+
+import pytest
+
+import model
+from app import app
+from model import Base, Session
+from model.database import cria_engine
+from model.slow_query import _SERVICES_DIR, formato_parametros, metodo_chamador, normaliza_sql
+from services import cache
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # limite 0: todo comando é registrado como lento
+    monkeypatch.setenv("SLOW_QUERY_MS", "0")
+    engine = cria_engine("sqlite:///%s" % (tmp_path / "test.sqlite3"))
+    Base.metadata.create_all(engine)
+    Session.configure(bind=engine)
+    cache.listagem_cache.limpa()
+    yield app.test_client()
+    cache.listagem_cache.limpa()
+    Session.configure(bind=model.engine)
+    engine.dispose()
+
+
+def registros(caplog):
+    return [json.loads(r.getMessage().split(" ", 1)[1]) for r in caplog.records
+            if r.getMessage().startswith("slow_query ")]
+
+
+def test_normaliza_sql_and_parameter_shapes():
+    sql = normaliza_sql("SELECT * FROM event\n WHERE user_id = 'a' AND id IN (?, ?, ?) LIMIT 10")
+    assert sql == "SELECT * FROM event WHERE user_id = ? AND id IN (?...) LIMIT ?"
+    assert normaliza_sql("SELECT x::text FROM t WHERE a = %(a)s") == "SELECT x::text FROM t WHERE a = ?"
+    assert formato_parametros(("user-a", 10)) == ["str", "int"]
+    assert formato_parametros([("a",), ("b",)], executemany=True) == {"execucoes": 2, "parametros": ["str"]}
+
+
+def test_metodo_chamador_names_methods_without_co_qualname():
+    # módulo compilado como se estivesse em services/; o nome é resolvido sem co_qualname,
+    # que não existe antes do python 3.11
+    codigo = (
+        "class EventService:\n"
+        "    def get_events():\n"
+        "        return chama()\n"
+        "    @staticmethod\n"
+        "    def conta():\n"
+        "        return chama()\n"
+        "def funcao():\n"
+        "    return chama()\n"
+    )
+    modulo = {"chama": metodo_chamador}
+    exec(compile(codigo, os.path.join(_SERVICES_DIR, "falso.py"), "exec"), modulo)
+
+    assert modulo["EventService"].get_events() == "services/falso.py:EventService.get_events"
+    assert modulo["EventService"].conta() == "services/falso.py:EventService.conta"
+    assert modulo["funcao"]() == "services/falso.py:funcao"
+    assert metodo_chamador() is None
+
+
+def test_slow_query_logs_caller_and_rate_limited_plan(client, caplog):
+    caplog.set_level(logging.WARNING)
+
+    client.get("/appointments?user_id=user-a&limit=5")
+    cache.listagem_cache.limpa()
+    client.get("/appointments?user_id=user-b&limit=5")
+
+    listagens = [r for r in registros(caplog) if "FROM event" in r["sql"] and "LIMIT" in r["sql"]]
+    assert len(listagens) == 2
+    assert listagens[0]["fingerprint"] == listagens[1]["fingerprint"]
+    assert listagens[0]["chamador"] == "services/event.py:EventService.get_events"
+    assert "user-a" not in json.dumps(listagens[0])
+    # o plano é capturado só na primeira ocorrência do SQL normalizado
+    assert any("USING INDEX" in linha for linha in listagens[0]["plano"])
+    assert "plano" not in listagens[1]